@@ -20,6 +20,10 @@ from class_c45 import C45DecisionTree
 from class_cart import CARTDecisionTree
 from heart_disease_ripper import analyze_heart_disease
 from knn_classifier import KNNClassifier
+from optimized_tree import AdvancedMemoizationTable
+
+# Diretório do cache de artefatos de codificação (ver `optimized_tree.ArtifactCache`)
+ARTIFACT_CACHE_DIR = ".cache_artefatos"
 
 # --- Funções Auxiliares ---
 def preprocess_for_id3(df_features: pd.DataFrame) -> pd.DataFrame:
@@ -37,15 +41,22 @@ def preprocess_for_id3(df_features: pd.DataFrame) -> pd.DataFrame:
     
     return df_processed
 
+@st.cache_resource
+def get_memo_table():
+    """Tabela de memoização compartilhada pelos modelos e pelas reexecuções do app."""
+    return AdvancedMemoizationTable()
+
 @st.cache_resource
 def get_model(algorithm):
     """Carrega a classe do modelo com base na seleção."""
+    # Codificações ficam em disco (ARTIFACT_CACHE_DIR) e são reaproveitadas entre reexecuções
+    shared = {'artifact_cache': ARTIFACT_CACHE_DIR, 'memo_table': get_memo_table()}
     if algorithm == 'ID3':
-        return ID3DecisionTree(max_depth=st.session_state.get('max_depth', 5))
+        return ID3DecisionTree(max_depth=st.session_state.get('max_depth', 5), **shared)
     elif algorithm == 'C4.5':
-        return C45DecisionTree(max_depth=st.session_state.get('max_depth', 5))
+        return C45DecisionTree(max_depth=st.session_state.get('max_depth', 5), **shared)
     elif algorithm == 'CART':
-        return CARTDecisionTree(max_depth=st.session_state.get('max_depth', 5))
+        return CARTDecisionTree(max_depth=st.session_state.get('max_depth', 5), **shared)
     return None
 
 def plot_confusion_matrix(y_true, y_pred, class_names):
@@ -225,9 +236,10 @@ if st.session_state.get('model_is_trained'):
                 input_df_processed = input_df
 
             with st.spinner("Classificando..."):
-                prediction = st.session_state.trained_model.predict(input_df_processed)
+                # Uma única linha: usa a árvore compilada em vez do predict em lote
+                prediction = st.session_state.trained_model.compile()(input_df_processed.iloc[0].to_dict())
             
-            st.success(f"## A classe prevista é: **{prediction[0]}**")
+            st.success(f"## A classe prevista é: **{prediction}**")
             st.write("---")
             st.write("**Valores Inseridos:**")
             st.dataframe(input_df)
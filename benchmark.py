@@ -0,0 +1,360 @@
+"""Benchmarks de treino e predição de ID3, C4.5, CART, kNN e do baseline do scikit-learn.
+
+Uso:
+    python benchmark.py run [--suite quick|full] [--models id3 cart ...] [--output arquivo.json]
+    python benchmark.py compare base.json novo.json [--threshold 0.15]
+    python benchmark.py regress [REF]      # roda a suíte em REF (padrão: HEAD) e na árvore atual e compara
+
+Cada suíte varia um fator por vez (linhas, atributos, fração de categóricos, cardinalidade
+dos categóricos e `max_depth`) em torno de uma configuração base, sobre dados sintéticos
+determinísticos. Cada caso roda em um processo novo, para que o pico de memória (RSS) seja
+o do caso e um tempo limite possa interrompê-lo. Os resultados vão para `resultados_benchmark/`.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Configurações ---
+OUTPUT_DIR = "resultados_benchmark"
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS = ['id3', 'c4.5', 'cart', 'knn', 'sklearn']
+# O kNN didático calcula distâncias em laço Python: limita o treino e as consultas
+KNN_MAX_TRAIN_ROWS = 10_000
+KNN_MAX_QUERIES = 50
+# Linhas de teste usadas para a vazão de predição e a acurácia
+MAX_TEST_ROWS = 100_000
+# Faixas (quantis) usadas para discretizar os contínuos antes do ID3
+ID3_BINS = 10
+
+SUITES = {
+    'quick': {
+        'base': {'n_rows': 10_000, 'n_features': 8, 'categorical_fraction': 0.25, 'cardinality': 10, 'max_depth': 8},
+        'sweeps': {
+            'n_rows': [1_000, 10_000, 100_000],
+            'n_features': [4, 16],
+            'categorical_fraction': [0.0, 1.0],
+            'cardinality': [2, 100],
+            'max_depth': [4, 12],
+        },
+    },
+    'full': {
+        'base': {'n_rows': 100_000, 'n_features': 10, 'categorical_fraction': 0.3, 'cardinality': 10, 'max_depth': 10},
+        'sweeps': {
+            'n_rows': [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+            'n_features': [5, 20, 50],
+            'categorical_fraction': [0.0, 0.5, 1.0],
+            'cardinality': [2, 10, 100, 1000],
+            'max_depth': [4, 8, 16],
+        },
+    },
+}
+
+# Métricas comparadas entre execuções: (chave, maior é pior)
+COMPARED_METRICS = [('fit_s', True), ('predict_rows_per_s', False), ('peak_rss_mb', True)]
+
+
+# --- Dados sintéticos ---
+def make_dataset(n_rows, n_features, categorical_fraction, cardinality, seed=0):
+    """Atributos numéricos normais e categóricos com `cardinality` níveis; alvo binário ruidoso."""
+    rng = np.random.default_rng(seed)
+    n_categorical = int(round(n_features * categorical_fraction))
+    score = np.zeros(n_rows)
+    columns = {}
+    for j in range(n_features - n_categorical):
+        values = rng.normal(size=n_rows)
+        score += rng.normal() * values
+        columns[f'num_{j}'] = values
+    for j in range(n_categorical):
+        codes = rng.integers(0, cardinality, n_rows)
+        score += rng.normal(size=cardinality)[codes]
+        columns[f'cat_{j}'] = pd.Categorical.from_codes(codes, [f'v{v}' for v in range(cardinality)])
+    score += rng.normal(scale=0.5 * max(1.0, score.std()), size=n_rows)
+    X = pd.DataFrame(columns)
+    y = pd.Series(np.where(score > np.median(score), 'sim', 'nao'), name='classe')
+    return X, y
+
+
+def _discretize(X_train, X_test):
+    """ID3 trata todo atributo como categórico: os contínuos viram faixas por quantis do treino."""
+    X_train, X_test = X_train.copy(), X_test.copy()
+    for column in X_train.columns:
+        if pd.api.types.is_numeric_dtype(X_train[column].dtype):
+            edges = np.unique(np.quantile(X_train[column], np.linspace(0, 1, ID3_BINS + 1)[1:-1]))
+            X_train[column] = pd.Categorical.from_codes(np.searchsorted(edges, X_train[column]), [f'q{i}' for i in range(len(edges) + 1)])
+            X_test[column] = pd.Categorical.from_codes(np.searchsorted(edges, X_test[column]), [f'q{i}' for i in range(len(edges) + 1)])
+    return X_train, X_test
+
+
+def _as_matrix(X):
+    """Matriz numérica (códigos dos categóricos) para o kNN e o scikit-learn."""
+    return np.column_stack([X[c].cat.codes.to_numpy() if isinstance(X[c].dtype, pd.CategoricalDtype) else X[c].to_numpy() for c in X.columns]).astype(float)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _tree_shape(tree):
+    """(nós, profundidade) de uma árvore no formato de dicionários aninhados."""
+    n_nodes, depth, stack = 0, 0, [(tree, 0)]
+    while stack:
+        node, level = stack.pop()
+        if node is None:
+            continue
+        n_nodes += 1
+        depth = max(depth, level)
+        stack.extend((child, level + 1) for child in node.get('children', {}).values())
+    return n_nodes, depth
+
+
+# --- Execução de um caso (em processo próprio) ---
+def run_case(case):
+    """Gera os dados, treina e prediz um modelo; roda dentro do processo do caso."""
+    sys.path.insert(0, case['source'])
+    config, model_name = case['config'], case['model']
+    X, y = make_dataset(config['n_rows'] + min(config['n_rows'], MAX_TEST_ROWS), config['n_features'],
+                        config['categorical_fraction'], config['cardinality'])
+    n_train = config['n_rows']
+    X_train, X_test, y_train, y_test = X.iloc[:n_train], X.iloc[n_train:], y.iloc[:n_train], y.iloc[n_train:]
+    result = {'data_rss_mb': _peak_rss_mb(), 'train_rows': n_train, 'test_rows': len(X_test)}
+
+    if model_name == 'knn':
+        from knn_classifier import KNNClassifier
+        model = KNNClassifier(k=5)
+        X_train, y_train = _as_matrix(X_train.iloc[:KNN_MAX_TRAIN_ROWS]), y_train.iloc[:KNN_MAX_TRAIN_ROWS]
+        X_test, y_test = _as_matrix(X_test.iloc[:KNN_MAX_QUERIES]), y_test.iloc[:KNN_MAX_QUERIES]
+        result.update(train_rows=len(X_train), test_rows=len(X_test))
+    elif model_name == 'sklearn':
+        from sklearn.tree import DecisionTreeClassifier
+        model = DecisionTreeClassifier(max_depth=config['max_depth'], random_state=0)
+        X_train, X_test = _as_matrix(X_train), _as_matrix(X_test)
+    else:
+        from optimized_tree import OptimizedDecisionTree
+        model = OptimizedDecisionTree(algorithm=model_name, max_depth=config['max_depth'])
+        if model_name == 'id3':
+            X_train, X_test = _discretize(X_train, X_test)
+
+    fit_times, predict_times = [], []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(case['repeat']):
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            predictions = model.predict(X_test)
+            predict_times.append(time.perf_counter() - start)
+
+    result.update(
+        fit_s=min(fit_times),
+        predict_rows_per_s=len(X_test) / max(min(predict_times), 1e-9),
+        accuracy=float(np.mean(np.asarray(predictions) == y_test.to_numpy())),
+        peak_rss_mb=_peak_rss_mb(),
+        n_nodes=None, depth=None,
+    )
+    if model_name == 'sklearn':
+        result.update(n_nodes=int(model.tree_.node_count), depth=int(model.get_depth()))
+    elif model_name != 'knn':
+        result['n_nodes'], result['depth'] = _tree_shape(model.tree)
+    return result
+
+
+def _execute(case, timeout):
+    """Roda o caso em um processo novo ('spawn'), interrompendo-o após `timeout` segundos."""
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(1)
+    try:
+        return {'status': 'ok', **pool.apply_async(run_case, (case,)).get(timeout)}
+    except multiprocessing.TimeoutError:
+        return {'status': 'timeout'}
+    except Exception as error:  # o caso falhou; registra e segue com os demais
+        return {'status': 'erro', 'error': f'{type(error).__name__}: {error}'}
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# --- Suíte ---
+def suite_cases(suite, models):
+    """Configurações únicas da suíte (um fator variado por vez) para cada modelo."""
+    spec = SUITES[suite]
+    configs = [dict(spec['base'])]
+    for parameter, values in spec['sweeps'].items():
+        for value in values:
+            config = {**spec['base'], parameter: value}
+            if config not in configs:
+                configs.append(config)
+    return [(config, model) for config in configs for model in models]
+
+
+def case_key(entry):
+    config = entry['config']
+    return (f"rows={config['n_rows']} feat={config['n_features']} cat={config['categorical_fraction']} "
+            f"card={config['cardinality']} depth={config['max_depth']} | {entry['model']}")
+
+
+def _git(*args, cwd=REPO_DIR):
+    try:
+        return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _source_revision(source):
+    commit = _git('rev-parse', '--short', 'HEAD', cwd=source)
+    if commit and _git('status', '--porcelain', '--untracked-files=no', cwd=source):
+        commit += '-dirty'
+    return commit
+
+
+def run_suite(suite='quick', models=None, source=REPO_DIR, output=None, repeat=3, timeout=600.0):
+    """Roda a suíte com o código de `source` e grava o JSON de resultados; devolve o caminho."""
+    models = models or MODELS
+    import sklearn
+    revision = _source_revision(source)
+    meta = {
+        'suite': suite, 'commit': revision, 'source': os.path.abspath(source), 'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+        'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'repeat': repeat,
+    }
+    cases = suite_cases(suite, models)
+    results = []
+    print(f"🚀 Benchmark '{suite}' ({len(cases)} casos) do código em {source} [{revision}]")
+    for i, (config, model) in enumerate(cases, 1):
+        entry = {'config': config, 'model': model}
+        entry.update(_execute({'config': config, 'model': model, 'source': os.path.abspath(source), 'repeat': repeat}, timeout))
+        results.append(entry)
+        if entry['status'] == 'ok':
+            print(f"   [{i}/{len(cases)}] {case_key(entry)}: treino {entry['fit_s']:.3f}s, "
+                  f"{entry['predict_rows_per_s']:,.0f} linhas/s, pico {entry['peak_rss_mb'] or 0:.0f} MiB"
+                  + (f", {entry['n_nodes']} nós" if entry['n_nodes'] is not None else ''))
+        else:
+            print(f"   [{i}/{len(cases)}] {case_key(entry)}: {entry['status']} {entry.get('error', '')}")
+
+    if output is None:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        output = os.path.join(OUTPUT_DIR, f"{revision or 'sem-git'}-{suite}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"✅ Resultados salvos em: {output}")
+    return output
+
+
+# --- Comparação ---
+def _elapsed(entry, metric):
+    """Duração medida por trás da métrica (a vazão de predição vira o tempo da predição)."""
+    return entry['test_rows'] / entry[metric] if metric == 'predict_rows_per_s' else entry[metric]
+
+
+def compare(base_path, new_path, threshold=0.15, min_seconds=0.05):
+    """Compara duas execuções caso a caso; devolve o número de regressões acima de `threshold`.
+
+    Tempos abaixo de `min_seconds` nas duas execuções são ruído de medição e não são comparados.
+    """
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    base_results = {case_key(entry): entry for entry in base['results']}
+    print(f"Comparando {base['meta'].get('commit')} (base) com {new['meta'].get('commit')} (novo), limite {threshold:.0%}")
+    print(f"{'caso':<70} {'métrica':<20} {'base':>12} {'novo':>12} {'razão':>7}")
+    regressions = 0
+    for entry in new['results']:
+        key = case_key(entry)
+        reference = base_results.get(key)
+        if reference is None:
+            continue
+        if entry['status'] != 'ok' or reference['status'] != 'ok':
+            if entry['status'] != reference['status']:
+                flag = '❌' if reference['status'] == 'ok' else '✅'
+                regressions += reference['status'] == 'ok'
+                print(f"{key:<70} {'status':<20} {reference['status']:>12} {entry['status']:>12} {'':>7} {flag}")
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS:
+            old_value, new_value = reference.get(metric), entry.get(metric)
+            if not old_value or not new_value:
+                continue
+            if metric != 'peak_rss_mb' and max(_elapsed(reference, metric), _elapsed(entry, metric)) < min_seconds:
+                continue
+            ratio = new_value / old_value
+            worse = ratio > 1 + threshold if higher_is_worse else ratio < 1 / (1 + threshold)
+            better = ratio < 1 / (1 + threshold) if higher_is_worse else ratio > 1 + threshold
+            regressions += worse
+            flag = '❌' if worse else ('✅' if better else '')
+            print(f"{key:<70} {metric:<20} {old_value:>12.4g} {new_value:>12.4g} {ratio:>7.2f} {flag}")
+        if reference.get('n_nodes') != entry.get('n_nodes'):
+            print(f"{key:<70} {'n_nodes':<20} {reference.get('n_nodes')!s:>12} {entry.get('n_nodes')!s:>12} {'':>7} ⚠️ árvore mudou")
+    print(f"{'❌' if regressions else '✅'} {regressions} regressões")
+    return regressions
+
+
+def regress(ref='HEAD', suite='quick', models=None, repeat=3, timeout=600.0, threshold=0.15):
+    """Roda a suíte em `ref` (checkout temporário via `git worktree`) e na árvore atual, e compara."""
+    commit = _git('rev-parse', '--verify', f'{ref}^{{commit}}')
+    if commit is None:
+        raise SystemExit(f"Referência git '{ref}' não encontrada.")
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, 'base')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, commit], cwd=REPO_DIR, check=True, capture_output=True)
+        try:
+            base_path = run_suite(suite, models, worktree, repeat=repeat, timeout=timeout)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=REPO_DIR, capture_output=True)
+    new_path = run_suite(suite, models, REPO_DIR, repeat=repeat, timeout=timeout)
+    return compare(base_path, new_path, threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de ID3, C4.5, CART e kNN contra o DecisionTreeClassifier do scikit-learn.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(command):
+        command.add_argument('--suite', choices=sorted(SUITES), default='quick')
+        command.add_argument('--models', nargs='+', choices=MODELS, default=MODELS)
+        command.add_argument('--repeat', type=int, default=3, help="repetições por caso (vale o menor tempo)")
+        command.add_argument('--timeout', type=float, default=600.0, help="limite em segundos por caso")
+
+    run = commands.add_parser('run', help="roda uma suíte e salva os resultados")
+    add_run_options(run)
+    run.add_argument('--output', help=f"arquivo JSON (padrão: {OUTPUT_DIR}/<commit>-<suíte>.json)")
+
+    comparison = commands.add_parser('compare', help="compara dois arquivos de resultados")
+    comparison.add_argument('base')
+    comparison.add_argument('new')
+    comparison.add_argument('--threshold', type=float, default=0.15, help="variação relativa tolerada")
+
+    regression = commands.add_parser('regress', help="roda a suíte em REF e na árvore atual e compara")
+    regression.add_argument('ref', nargs='?', default='HEAD')
+    add_run_options(regression)
+    regression.add_argument('--threshold', type=float, default=0.15, help="variação relativa tolerada")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        run_suite(args.suite, args.models, REPO_DIR, args.output, args.repeat, args.timeout)
+        return 0
+    if args.command == 'compare':
+        return 1 if compare(args.base, args.new, args.threshold) else 0
+    return 1 if regress(args.ref, args.suite, args.models, args.repeat, args.timeout, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import pandas as pd
+import optimized_tree
 from optimized_tree import OptimizedDecisionTree
 
 class C45DecisionTree:
@@ -10,12 +11,20 @@ class C45DecisionTree:
     categóricos e contínuos).
     """
     
-    def __init__(self, max_depth=10):
+    def __init__(self, max_depth=10, min_category_samples=0, artifact_cache=None, memo_table=None,
+                 growth='recursive', min_samples_split=2, min_impurity_decrease=0.0,
+                 max_time=None, max_nodes=None, max_memory_bytes=None):
         """
         Inicializa o modelo C4.5 encapsulando o motor otimizado.
         """
         # Instancia o motor principal, travando o algoritmo em 'c45'
-        self.model = OptimizedDecisionTree(algorithm='c45', max_depth=max_depth)
+        # Valores com menos de `min_category_samples` amostras no nó são agrupados em "outros"
+        # `artifact_cache` (diretório) e `memo_table` permitem reaproveitar codificações e métricas entre modelos
+        # growth='best_first' com `max_time`, `max_nodes` ou `max_memory_bytes` treina sob orçamento (relatado em get_performance_metrics)
+        self.model = OptimizedDecisionTree(algorithm='c45', max_depth=max_depth, min_category_samples=min_category_samples,
+                                           artifact_cache=artifact_cache, memo_table=memo_table, growth=growth,
+                                           min_samples_split=min_samples_split, min_impurity_decrease=min_impurity_decrease,
+                                           max_time=max_time, max_nodes=max_nodes, max_memory_bytes=max_memory_bytes)
         self.feature_names_in_ = None
         self.target_name_ = None
 
@@ -37,11 +46,39 @@ class C45DecisionTree:
         """
         Faz predições para novos dados.
         """
-        if self.model.tree is None:
+        if self.model.compact_tree is None:
             raise RuntimeError("O modelo deve ser treinado com .fit() antes de prever.")
             
         return self.model.predict(X)
         
+    def predict_proba(self, X: pd.DataFrame):
+        """
+        Retorna as probabilidades de cada classe (colunas na ordem de `classes_`).
+        """
+        return self.model.predict_proba(X)
+
+    def apply(self, X: pd.DataFrame):
+        """
+        Retorna o índice do nó final alcançado por cada linha.
+        """
+        return self.model.apply(X)
+
+    def decision_path(self, X: pd.DataFrame):
+        """
+        Retorna a matriz esparsa de nós visitados por cada linha.
+        """
+        return self.model.decision_path(X)
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def compile(self):
+        """
+        Retorna a árvore compilada para classificar uma linha por vez (dict ou tupla).
+        """
+        return self.model.compile()
+
     def get_tree_structure(self) -> dict:
         """
         Retorna a árvore gerada como um dicionário para visualização.
@@ -52,14 +89,20 @@ class C45DecisionTree:
         """
         Retorna as métricas de performance do cache do motor.
         """
-        metrics = self.model.memo_table.metrics
-        total_hits = sum(metrics['hits'].values())
-        total_misses = sum(metrics['misses'].values())
-        total_calls = total_hits + total_misses
-        hit_rate = total_hits / total_calls if total_calls > 0 else 0
-        
-        return {
-            'cache_hit_rate': hit_rate,
-            'cache_hits': total_hits,
-            'cache_misses': total_misses
-        }
+        # Cache (acertos, falhas, remoções, bytes, tempo economizado) e métricas do treino, incluindo o orçamento
+        return self.model.get_performance_metrics()
+
+    @classmethod
+    def cross_validate(cls, X: pd.DataFrame, y: pd.Series, cv=5, n_jobs=1, **params) -> dict:
+        """
+        Validação cruzada estratificada do C4.5, com os folds em paralelo entre processos se n_jobs > 1.
+        """
+        return optimized_tree.cross_validate('c45', X, y, cv=cv, n_jobs=n_jobs, **params)
+
+    @classmethod
+    def grid_search(cls, X: pd.DataFrame, y: pd.Series, param_grid, cv=5, n_jobs=1, factor=3, **params) -> dict:
+        """
+        Busca em grade do C4.5 com validação cruzada e halving sucessivo (n_jobs > 1 usa processos).
+        """
+        # O dataset é codificado uma vez para todos os folds e candidatos; os piores saem a cada rodada
+        return optimized_tree.grid_search('c45', X, y, param_grid, cv=cv, n_jobs=n_jobs, factor=factor, **params)
@@ -12,10 +12,13 @@ from dados import dados_credito
 from class_id3 import ID3DecisionTree
 from class_c45 import C45DecisionTree
 from class_cart import CARTDecisionTree
+from optimized_tree import AdvancedMemoizationTable
 
 # --- Configurações ---
 OUTPUT_DIR = "resultados_img"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Codificações em disco e métricas memoizadas compartilhadas pelos três algoritmos (e entre execuções)
+ARTIFACT_CACHE_DIR = ".cache_artefatos"
 
 # --- Funções Auxiliares ---
 def plot_confusion_matrix(y_true, y_pred, class_names, model_name):
@@ -63,10 +66,11 @@ X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_
 class_names = sorted(y.unique())
 
 # --- Modelos a serem avaliados ---
+memo_table = AdvancedMemoizationTable()
 models = {
-    "ID3": ID3DecisionTree(max_depth=5),
-    "C4.5": C45DecisionTree(max_depth=5),
-    "CART": CARTDecisionTree(max_depth=5)
+    "ID3": ID3DecisionTree(max_depth=5, artifact_cache=ARTIFACT_CACHE_DIR, memo_table=memo_table),
+    "C4.5": C45DecisionTree(max_depth=5, artifact_cache=ARTIFACT_CACHE_DIR, memo_table=memo_table),
+    "CART": CARTDecisionTree(max_depth=5, artifact_cache=ARTIFACT_CACHE_DIR, memo_table=memo_table)
 }
 
 results = {}
@@ -76,12 +80,14 @@ for name, model in models.items():
     print(f"\n{'='*20} Avaliando Modelo: {name} {'='*20}")
     
     # Pré-processamento específico do ID3
+    X_processed = X.copy()
     X_train_processed = X_train.copy()
     X_test_processed = X_test.copy()
     if name == "ID3":
         # ID3 requer atributos categóricos, então discretizamos a idade
         age_bins = [0, 30, 45, 100]
         age_labels = ['Jovem', 'Adulto', 'Idoso']
+        X_processed['Idade'] = pd.cut(X_processed['Idade'], bins=age_bins, labels=age_labels, include_lowest=True).astype(str)
         X_train_processed['Idade'] = pd.cut(X_train_processed['Idade'], bins=age_bins, labels=age_labels, include_lowest=True).astype(str)
         X_test_processed['Idade'] = pd.cut(X_test_processed['Idade'], bins=age_bins, labels=age_labels, include_lowest=True).astype(str)
 
@@ -97,6 +103,11 @@ for name, model in models.items():
     
     print(f"\nRelatório de Classificação - {name}:\n{report}")
     print(f"Acurácia - {name}: {accuracy:.2%}")
+
+    # Validação cruzada (5 folds) com a mesma profundidade: menos dependente de uma única divisão.
+    # Em série: com 30 linhas, subir um pool de processos custaria mais que os treinos
+    cv_result = type(model).cross_validate(X_processed, y, cv=5, n_jobs=1, max_depth=model.model.max_depth)
+    print(f"Acurácia em validação cruzada - {name}: {cv_result['mean_score']:.2%} (± {cv_result['std_score']:.2%})")
     
     # Geração de Gráficos
     cm_path = plot_confusion_matrix(y_test, y_pred, class_names, name)
@@ -105,6 +116,7 @@ for name, model in models.items():
     results[name] = {
         "report": classification_report(y_test, y_pred, zero_division=0, output_dict=True),
         "accuracy": accuracy,
+        "cv_accuracy": cv_result['mean_score'],
         "cm_path": cm_path,
         "tree_path": tree_path
     }
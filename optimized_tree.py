@@ -1,12 +1,26 @@
+import copy
+import hashlib
+import heapq
+import itertools
+import json
 import math
+import os
+import struct
+import sys
+import threading
 import time
-from collections import Counter, defaultdict
-from dataclasses import dataclass
+import tracemalloc
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, Optional, Union
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterator, Optional, Union
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 
 
 # =====================================================================
@@ -21,11 +35,331 @@ class AlgorithmType(Enum):
 
 @dataclass(frozen=True, eq=True)
 class ComputationKey:
-    """Chave imutável e hashable para memoização."""
-    data_hash: int
+    """Chave imutável e hashable para memoização, compartilhada entre algoritmos."""
+    data_key: tuple
     feature: Optional[str] = None
     computation_type: str = "default"
-    algorithm: Optional[AlgorithmType] = None
+    algorithm: Optional[AlgorithmType] = field(default=None, compare=False)
+
+
+def _compact_code_dtype(n_codes: int) -> np.dtype:
+    """Menor tipo inteiro sem sinal capaz de representar `n_codes` códigos."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_codes <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+# Tamanho da amostra (reservatório) por atributo contínuo usada para as bordas dos bins no treino em fluxo
+STREAM_SAMPLE_SIZE = 200_000
+
+
+# Versão do formato dos artefatos em disco; entra em todas as impressões digitais
+ARTIFACT_CACHE_VERSION = 1
+
+
+class ArtifactCache:
+    """Cache em disco dos artefatos de codificação, endereçado pelo conteúdo de cada coluna."""
+    # Layout: <diretório>/<impressão[:2]>/<impressão>/<nome>.npy, aberto com memory-map;
+    # escritas atômicas (temporário + os.replace) permitem dividir o diretório entre processos.
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(column: Union[pd.Series, np.ndarray]) -> str:
+        """Impressão digital (BLAKE2b) do tipo e do conteúdo de uma coluna."""
+        digest = hashlib.blake2b(digest_size=16)
+        values = column.to_numpy() if isinstance(column, pd.Series) and not isinstance(column.dtype, pd.CategoricalDtype) else column
+        digest.update(f"v{ARTIFACT_CACHE_VERSION}:{getattr(column, 'dtype', None)}:{len(column)}".encode())
+        if isinstance(values, np.ndarray) and values.dtype != object:
+            digest.update(np.ascontiguousarray(values).view(np.uint8))
+        else:
+            digest.update(pd.util.hash_pandas_object(pd.Series(column), index=False).to_numpy())
+        return digest.hexdigest()
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self.directory, key[:2], key, name)
+
+    def _load(self, key: str, name: str) -> Optional[np.ndarray]:
+        path = self._path(key, name)
+        if os.path.exists(path + '.npy'):
+            return np.load(path + '.npy', mmap_mode='r')
+        if os.path.exists(path + '.json'):
+            with open(path + '.json', encoding='utf-8') as f:
+                return _labels_from_json(json.load(f))
+        return None
+
+    def _store(self, key: str, name: str, array: np.ndarray):
+        path = self._path(key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if array.dtype == object:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(_labels_to_json(array), f)
+            os.replace(tmp, path + '.json')
+        else:
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, path + '.npy')
+
+    def fetch(self, key: str, names: tuple, compute: Callable[[], tuple]) -> tuple:
+        """Artefatos `names` da chave; se algum faltar, `compute()` os gera e grava."""
+        found = tuple(self._load(key, name) for name in names)
+        if all(array is not None for array in found):
+            self.hits += 1
+            return found
+        self.misses += 1
+        arrays = compute()
+        for name, array in zip(names, arrays):
+            self._store(key, name, array)
+        return arrays
+
+
+@dataclass
+class EncodedDataset:
+    """Representação colunar codificada uma única vez no `fit`."""
+    feature_names: list
+    y_codes: np.ndarray
+    classes: np.ndarray
+    categorical_codes: np.ndarray
+    categorical_features: list
+    categories: Dict[str, np.ndarray]
+    numeric: Dict[str, np.ndarray]
+    bin_codes: Optional[np.ndarray] = None
+    bin_edges: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._categorical_column = {f: j for j, f in enumerate(self.categorical_features)}
+        self._bin_column = {f: j for j, f in enumerate(self.numeric)}
+        # Cache de artefatos em disco e impressão digital de cada coluna (ver `ArtifactCache`)
+        self._cache: Optional[ArtifactCache] = None
+        self._fingerprints: Dict[str, str] = {}
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.y_codes)
+
+    @property
+    def n_classes(self) -> int:
+        return len(self.classes)
+
+    @staticmethod
+    def _factorize(column: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        uniques = np.asarray(uniques, dtype=object) if uniques.dtype == object else np.asarray(uniques)
+        return codes.astype(_compact_code_dtype(len(uniques))), uniques
+
+    @classmethod
+    def from_frame(cls, X: pd.DataFrame, y: pd.Series, continuous_features: list, cache: Optional[ArtifactCache] = None) -> "EncodedDataset":
+        """Codifica `X` e `y`; `continuous_features` recebem divisões por limiar."""
+        fingerprints = {}
+        if cache is not None:
+            fingerprints = {f: cache.fingerprint(X[f]) for f in X.columns}
+            y_codes, classes = cache.fetch(cache.fingerprint(y), ('target_codes', 'classes'), lambda: cls._encode_target(y))
+        else:
+            y_codes, classes = cls._encode_target(y)
+        categorical_features = [f for f in X.columns if f not in continuous_features]
+        categories, codes = {}, []
+        for feature in categorical_features:
+            if cache is not None:
+                feature_codes, uniques = cache.fetch(fingerprints[feature], ('codes', 'values'), lambda: cls._factorize(X[feature]))
+            else:
+                feature_codes, uniques = cls._factorize(X[feature])
+            categories[feature] = uniques
+            codes.append(feature_codes)
+        max_values = max((len(v) for v in categories.values()), default=1)
+        categorical_codes = np.empty((len(X), len(codes)), dtype=_compact_code_dtype(max_values))
+        for j, feature_codes in enumerate(codes):
+            categorical_codes[:, j] = feature_codes
+        numeric = {}
+        for feature in continuous_features:
+            dtype = np.float32 if X[feature].dtype == np.float32 else np.float64
+            numeric[feature] = np.ascontiguousarray(X[feature].to_numpy(dtype=dtype, na_value=np.nan))
+        dataset = cls(
+            feature_names=list(X.columns), y_codes=y_codes, classes=classes, categorical_codes=categorical_codes,
+            categorical_features=categorical_features, categories=categories, numeric=numeric,
+        )
+        dataset._cache, dataset._fingerprints = cache, fingerprints
+        return dataset
+
+    @staticmethod
+    def _encode_target(y: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        classes, y_codes = np.unique(y.to_numpy(), return_inverse=True)
+        return y_codes.astype(_compact_code_dtype(len(classes))), classes
+
+    def argsort(self, feature: str) -> np.ndarray:
+        """Posições das linhas em ordem crescente de um atributo contínuo (estável)."""
+        compute = lambda: (np.argsort(self.numeric[feature], kind='mergesort'),)
+        if self._cache is None:
+            return compute()[0]
+        return self._cache.fetch(self._fingerprints[feature], ('order',), compute)[0]
+
+    @classmethod
+    def schema_from_chunks(cls, chunks: Iterator[tuple[pd.DataFrame, pd.Series]], max_bins: int = 255) -> "EncodedDataset":
+        """Passada de esquema do treino em fluxo: um conjunto sem linhas com classes, vocabulários e bins."""
+        rng = np.random.default_rng(0)
+        feature_names, labels = None, []
+        for X, y in chunks:
+            if feature_names is None:
+                feature_names = list(X.columns)
+                continuous = [f for f in feature_names if pd.api.types.is_numeric_dtype(X[f].dtype)]
+                vocabularies = {f: pd.Index([], dtype=object) for f in feature_names if f not in continuous}
+                distinct = {f: np.empty(0) for f in continuous}
+                reservoirs = {f: np.empty(0) for f in continuous}
+                seen = dict.fromkeys(continuous, 0)
+            labels.append(pd.unique(y.to_numpy()))
+            for feature, vocabulary in vocabularies.items():
+                uniques = pd.unique(X[feature].to_numpy(dtype=object))
+                new = uniques[vocabulary.get_indexer(uniques) < 0]
+                if len(new):
+                    vocabularies[feature] = vocabulary.append(pd.Index(new, dtype=object))
+            for feature in continuous:
+                values = X[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                if distinct[feature] is not None:
+                    merged = np.union1d(distinct[feature], values)
+                    distinct[feature] = merged if len(merged) <= max_bins else None
+                # Reservatório vetorizado: o t-ésimo valor entra com probabilidade STREAM_SAMPLE_SIZE / t
+                reservoir, room = reservoirs[feature], STREAM_SAMPLE_SIZE - len(reservoirs[feature])
+                reservoir = np.concatenate((reservoir, values[:room]))
+                rest = values[room:]
+                if rest.size:
+                    t = seen[feature] + room + np.arange(1, rest.size + 1)
+                    accepted = rest[rng.random(rest.size) * t < STREAM_SAMPLE_SIZE]
+                    reservoir[rng.integers(0, STREAM_SAMPLE_SIZE, accepted.size)] = accepted
+                reservoirs[feature], seen[feature] = reservoir, seen[feature] + values.size
+        if feature_names is None:
+            raise ValueError("Nenhum bloco de dados recebido.")
+        classes = np.unique(np.concatenate(labels))
+        bin_edges = {}
+        for feature in continuous:
+            if distinct[feature] is not None:
+                bin_edges[feature] = (distinct[feature][:-1] + distinct[feature][1:]) / 2.0
+            else:
+                bin_edges[feature] = cls._bin_edges(reservoirs[feature], max_bins)
+        categorical_features = list(vocabularies)
+        categories = {f: np.asarray(v, dtype=object) for f, v in vocabularies.items()}
+        max_values = max((len(v) for v in categories.values()), default=1)
+        max_bins_used = max((len(e) + 2 for e in bin_edges.values()), default=1)
+        return cls(
+            feature_names=feature_names, y_codes=np.empty(0, dtype=_compact_code_dtype(len(classes))), classes=classes,
+            categorical_codes=np.empty((0, len(categorical_features)), dtype=_compact_code_dtype(max_values)),
+            categorical_features=categorical_features, categories=categories,
+            numeric={f: np.empty(0) for f in continuous},
+            bin_codes=np.empty((0, len(continuous)), dtype=_compact_code_dtype(max_bins_used)), bin_edges=bin_edges,
+        )
+
+    def encode_chunk(self, X: pd.DataFrame, y: pd.Series) -> "EncodedDataset":
+        """Codifica um bloco com os vocabulários e bins deste esquema (ver `schema_from_chunks`)."""
+        y_codes = pd.Index(self.classes).get_indexer(y.to_numpy())
+        categorical_codes = np.empty((len(X), len(self.categorical_features)), dtype=self.categorical_codes.dtype)
+        for j, feature in enumerate(self.categorical_features):
+            codes = pd.Index(self.categories[feature]).get_indexer(X[feature].to_numpy(dtype=object))
+            if (codes < 0).any() or (y_codes < 0).any():
+                raise ValueError("Os blocos mudaram entre passadas: valor ausente do esquema.")
+            categorical_codes[:, j] = codes
+        numeric = {f: X[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in self.numeric}
+        bin_codes = np.empty((len(X), len(numeric)), dtype=self.bin_codes.dtype)
+        for j, (feature, values) in enumerate(numeric.items()):
+            bin_codes[:, j] = self._digitize(values, self.bin_edges[feature])
+        return EncodedDataset(
+            feature_names=self.feature_names, y_codes=y_codes.astype(self.y_codes.dtype), classes=self.classes,
+            categorical_codes=categorical_codes, categorical_features=self.categorical_features,
+            categories=self.categories, numeric=numeric, bin_codes=bin_codes, bin_edges=self.bin_edges,
+        )
+
+    @staticmethod
+    def _digitize(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        codes = np.searchsorted(edges, values, side='left')
+        codes[np.isnan(values)] = len(edges) + 1
+        return codes
+
+    @staticmethod
+    def _bin_edges(values: np.ndarray, max_bins: int) -> np.ndarray:
+        finite = values[~np.isnan(values)]
+        distinct = np.unique(finite)
+        if len(distinct) <= max_bins:
+            return (distinct[:-1] + distinct[1:]) / 2.0
+        # Cortes por quantis, ajustados para pontos médios entre valores distintos vizinhos
+        quantiles = np.quantile(finite, np.linspace(0, 1, max_bins + 1)[1:-1], method='lower')
+        idx = np.unique(np.searchsorted(distinct, quantiles, side='left'))
+        idx = idx[idx < len(distinct) - 1]
+        return (distinct[idx] + distinct[idx + 1]) / 2.0
+
+    def add_bins(self, max_bins: int = 255) -> "EncodedDataset":
+        """Quantiza os atributos contínuos em bins inteiros (o último bin guarda os NaN)."""
+        numeric_features = list(self.numeric)
+        feature_bins = {}
+        for feature in numeric_features:
+            def compute(feature=feature):
+                edges = self._bin_edges(self.numeric[feature].astype(np.float64), max_bins)
+                return edges, self._digitize(self.numeric[feature], edges).astype(_compact_code_dtype(len(edges) + 2))
+            if self._cache is None:
+                feature_bins[feature] = compute()
+            else:
+                key = self._fingerprints[feature]
+                feature_bins[feature] = self._cache.fetch(key, (f'bin_edges_{max_bins}', f'bin_codes_{max_bins}'), compute)
+        self.bin_edges = {f: np.asarray(edges) for f, (edges, _) in feature_bins.items()}
+        max_bins_used = max((len(e) + 2 for e in self.bin_edges.values()), default=1)
+        self.bin_codes = np.empty((self.n_samples, len(numeric_features)), dtype=_compact_code_dtype(max_bins_used))
+        for j, feature in enumerate(numeric_features):
+            self.bin_codes[:, j] = feature_bins[feature][1]
+        return self
+
+    def _code_source(self, feature: str) -> tuple[np.ndarray, int, int]:
+        """Matriz de códigos, coluna e número de valores de um atributo discreto ou binado."""
+        if feature in self._categorical_column:
+            return self.categorical_codes, self._categorical_column[feature], len(self.categories[feature])
+        return self.bin_codes, self._bin_column[feature], len(self.bin_edges[feature]) + 2
+
+    def codes(self, feature: str) -> np.ndarray:
+        matrix, column, _ = self._code_source(feature)
+        return matrix[:, column]
+
+    def n_values(self, feature: str) -> int:
+        return self._code_source(feature)[2]
+
+    def contingency_tables(self, rows: np.ndarray, features: list, node_ids: Optional[np.ndarray] = None, n_nodes: int = 1,
+                           weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Tabelas (valor x classe), ou somas de `weights`, de vários atributos e nós em uma passada."""
+        k = self.n_classes if weights is None else weights.shape[1]
+        y_codes = self.y_codes[rows].astype(np.intp)
+        tables = {}
+        groups = {}
+        for feature in features:
+            matrix, column, n_values = self._code_source(feature)
+            groups.setdefault(id(matrix), (matrix, []))[1].append((feature, column, n_values))
+        for matrix, selected in groups.values():
+            columns = [column for _, column, _ in selected]
+            sizes = np.array([n_values for _, _, n_values in selected], dtype=np.intp)
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            n_values_total = int(sizes.sum())
+            width = n_values_total * k
+            block = matrix[rows]
+            if columns != list(range(matrix.shape[1])):
+                block = block[:, columns]
+            values = block.astype(np.intp)
+            values += offsets
+            if node_ids is not None:
+                values += (node_ids.astype(np.intp) * n_values_total)[:, np.newaxis]
+            if weights is None:
+                values *= k
+                values += y_codes[:, np.newaxis]
+                counts = np.bincount(values.ravel(), minlength=n_nodes * width)
+            else:
+                # Um bincount por coluna de pesos sobre as mesmas chaves
+                keys = values.ravel()
+                counts = np.empty((n_nodes * n_values_total, k))
+                for c in range(k):
+                    counts[:, c] = np.bincount(keys, weights=np.repeat(weights[:, c], len(columns)), minlength=n_nodes * n_values_total)
+            counts = counts.reshape(n_nodes, width)
+            for (feature, _, n_values), offset in zip(selected, offsets):
+                table = counts[:, offset * k:(offset + n_values) * k].reshape(n_nodes, n_values, k)
+                tables[feature] = table if node_ids is not None else table[0]
+        return tables
 
 
 # =====================================================================
@@ -33,254 +367,2200 @@ class ComputationKey:
 # =====================================================================
 
 class AdvancedMemoizationTable:
-    """Tabela de memoização otimizada com múltiplas estratégias de cache."""
+    """Tabela de memoização LRU para métricas de impureza, indexada pelo vetor de contagens."""
 
-    def __init__(self, max_cache_size=20000):
-        self.caches = {alg: {} for alg in AlgorithmType}
-        self.caches['shared'] = {}
+    # Custo aproximado de uma entrada além dos bytes da chave e do valor (objetos e dicionário)
+    _ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self, max_cache_size=20000, max_cache_bytes: Optional[int] = None):
+        self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
+        # chave -> (resultado, bytes estimados, segundos gastos no cálculo)
+        self.cache: OrderedDict = OrderedDict()
+        self.resident_bytes = 0
         self.metrics = {
             'hits': defaultdict(int),
             'misses': defaultdict(int),
+            'evictions': defaultdict(int),
         }
+        self.time_saved = 0.0
+        self.lookup_overhead = 0.0
+        # Subárvores construídas em threads compartilham a tabela
+        self._lock = threading.Lock()
 
-    def _hash_data(self, data: Union[pd.Series, np.ndarray]) -> int:
-        """Cria hash eficiente para dados pandas/numpy."""
+    @staticmethod
+    def _canonical_counts(data: Union[pd.Series, np.ndarray]) -> tuple:
+        """Vetor de contagens canônico: tupla decrescente de inteiros, sem zeros."""
         if isinstance(data, pd.Series):
-            return int(pd.util.hash_pandas_object(data, index=True).sum())
-        elif isinstance(data, np.ndarray):
-            return hash(data.tobytes())
-        else:
-            return hash(tuple(data))
+            data = data.value_counts().to_numpy()
+        return tuple(sorted((c for c in np.asarray(data).tolist() if c > 0), reverse=True))
 
     def get_cached_result(self, key: ComputationKey) -> Optional[Any]:
-        """Recupera resultado do cache."""
-        cache = self.caches.get(key.algorithm, self.caches['shared'])
-        result = cache.get(key)
-        if result is not None:
-            self.metrics['hits'][key.algorithm or 'shared'] += 1
-            return result
-        
-        self.metrics['misses'][key.algorithm or 'shared'] += 1
-        return None
+        """Recupera resultado do cache, marcando a entrada como a mais recente."""
+        label = key.algorithm or 'shared'
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.metrics['misses'][label] += 1
+                return None
+            self.cache.move_to_end(key)
+            self.metrics['hits'][label] += 1
+            self.time_saved += entry[2]
+            return entry[0]
 
-    def cache_result(self, key: ComputationKey, result: Any):
-        """Armazena resultado no cache."""
-        cache = self.caches.get(key.algorithm, self.caches['shared'])
-        cache[key] = result
+    def cache_result(self, key: ComputationKey, result: Any, compute_seconds: float = 0.0):
+        """Armazena resultado no cache e aplica os limites de entradas e de bytes."""
+        nbytes = sys.getsizeof(key.data_key) + sys.getsizeof(result) + self._ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self.cache:
+                self.resident_bytes -= self.cache.pop(key)[1]
+            self.cache[key] = (result, nbytes, compute_seconds)
+            self.resident_bytes += nbytes
+            while self.cache and (
+                len(self.cache) > self.max_cache_size
+                or (self.max_cache_bytes is not None and self.resident_bytes > self.max_cache_bytes)
+            ):
+                evicted_key, (_, evicted_bytes, _) = self.cache.popitem(last=False)
+                self.resident_bytes -= evicted_bytes
+                self.metrics['evictions'][evicted_key.algorithm or 'shared'] += 1
 
-    def _calculate_metric(self, y: pd.Series, metric_func: Callable, computation_type: str, algorithm: AlgorithmType) -> float:
+    def _calculate_metric(self, data: Union[pd.Series, np.ndarray], metric_func: Callable, computation_type: str, algorithm: AlgorithmType) -> float:
         """Função genérica para calcular e cachear uma métrica (Entropia, Gini)."""
-        if y.empty:
+        start = time.perf_counter()
+        counts = self._canonical_counts(data)
+        if not counts:
             return 0.0
-
-        key = ComputationKey(
-            data_hash=self._hash_data(y),
-            computation_type=computation_type,
-            algorithm=algorithm
-        )
-        
+        key = ComputationKey(data_key=counts, computation_type=computation_type, algorithm=algorithm)
         cached = self.get_cached_result(key)
         if cached is not None:
+            self.lookup_overhead += time.perf_counter() - start
             return cached
-        
-        result = metric_func(y)
-        self.cache_result(key, result)
+
+        compute_start = time.perf_counter()
+        result = metric_func(counts)
+        compute_seconds = time.perf_counter() - compute_start
+        self.cache_result(key, result, compute_seconds)
+        self.lookup_overhead += time.perf_counter() - start - compute_seconds
         return result
 
-    def entropy(self, y: pd.Series, algorithm: AlgorithmType) -> float:
+    def entropy(self, data: Union[pd.Series, np.ndarray], algorithm: AlgorithmType) -> float:
         """Calcula a Entropia de Shannon com memoização."""
-        def _entropy_calc(data: pd.Series) -> float:
-            counts = data.value_counts()
-            probs = counts / len(data)
-            probs = probs[probs > 0] # Evita log(0)
-            return -np.sum(probs * np.log2(probs))
-        
-        return self._calculate_metric(y, _entropy_calc, "entropy", algorithm)
-
-    def gini_impurity(self, y: pd.Series, algorithm: AlgorithmType) -> float:
+        def _entropy_calc(counts: tuple) -> float:
+            n = sum(counts)
+            return -sum((c / n) * math.log2(c / n) for c in counts)
+
+        return self._calculate_metric(data, _entropy_calc, "entropy", algorithm)
+
+    def gini_impurity(self, data: Union[pd.Series, np.ndarray], algorithm: AlgorithmType) -> float:
         """Calcula a Impureza de Gini com memoização."""
-        def _gini_calc(data: pd.Series) -> float:
-            counts = data.value_counts()
-            probs = counts / len(data)
-            return 1 - np.sum(probs**2)
+        def _gini_calc(counts: tuple) -> float:
+            n = sum(counts)
+            return 1 - sum((c / n) ** 2 for c in counts)
+
+        return self._calculate_metric(data, _gini_calc, "gini", algorithm)
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo do cache: acertos, falhas, remoções, memória e tempo economizado."""
+        hits = sum(self.metrics['hits'].values())
+        misses = sum(self.metrics['misses'].values())
+        calls = hits + misses
+        return {
+            'cache_hit_rate': hits / calls if calls > 0 else 0,
+            'cache_hits': hits,
+            'cache_misses': misses,
+            'cache_evictions': sum(self.metrics['evictions'].values()),
+            'cache_entries': len(self.cache),
+            'cache_resident_bytes': self.resident_bytes,
+            'cache_time_saved_s': self.time_saved,
+            'cache_net_time_saved_s': self.time_saved - self.lookup_overhead,
+        }
+
+
+# =====================================================================
+# 3. PARALELISMO (LOTES DE ATRIBUTOS E MEMÓRIA COMPARTILHADA)
+# =====================================================================
+
+# Abaixo deste volume (linhas x atributos) o nó é avaliado em série: o custo de despacho
+# para o pool superaria o ganho.
+PARALLEL_MIN_CELLS = 100_000
+
+# Volume mínimo (em linhas) de uma tarefa de subárvores; irmãos pequenos são agrupados em
+# lotes até este tamanho e o que sobra é construído em linha.
+PARALLEL_MIN_SUBTREE_SAMPLES = 2_000
+
+
+@dataclass
+class _PendingSubtree:
+    """Marcador de uma subárvore que está sendo construída por uma tarefa do pool."""
+    future: Future
+    index: int
+
+
+class SharedDatasetBuffers:
+    """Publica as colunas de um EncodedDataset em memória compartilhada para os processos."""
+
+    def __init__(self, data: EncodedDataset):
+        self._blocks = []
+        arrays = {'y_codes': data.y_codes, 'categorical_codes': data.categorical_codes}
+        arrays.update({f'numeric:{f}': values for f, values in data.numeric.items()})
+        self.spec = {
+            'token': f'{os.getpid()}-{id(self)}',
+            'arrays': {name: self._publish(array) for name, array in arrays.items()},
+            'feature_names': data.feature_names, 'classes': data.classes,
+            'categorical_features': data.categorical_features, 'categories': data.categories,
+            'numeric_features': list(data.numeric),
+        }
+
+    def _publish(self, array: np.ndarray) -> tuple:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self._blocks.append(block)
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+# Estado de cada processo de trabalho: token do spec -> (blocos, dataset, construtores)
+_WORKER_STATE: Dict[str, tuple] = {}
 
-        return self._calculate_metric(y, _gini_calc, "gini", algorithm)
+
+def _attach_shared_dataset(spec: dict) -> tuple:
+    state = _WORKER_STATE.get(spec['token'])
+    if state is None:
+        blocks, arrays = [], {}
+        for name, (block_name, shape, dtype) in spec['arrays'].items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        data = EncodedDataset(
+            feature_names=spec['feature_names'], y_codes=arrays['y_codes'], classes=spec['classes'],
+            categorical_codes=arrays['categorical_codes'], categorical_features=spec['categorical_features'],
+            categories=spec['categories'], numeric={f: arrays[f'numeric:{f}'] for f in spec['numeric_features']},
+        )
+        state = (blocks, data, {})
+        # Um treino por vez: mapeamentos de treinos anteriores são liberados
+        for old_blocks, _, _ in _WORKER_STATE.values():
+            for block in old_blocks:
+                block.close()
+        _WORKER_STATE.clear()
+        _WORKER_STATE[spec['token']] = state
+    return state
+
+
+def _worker_builder(spec: dict, algorithm_value: str) -> tuple:
+    _, data, builders = _attach_shared_dataset(spec)
+    builder = builders.get(algorithm_value)
+    if builder is None:
+        builder = builders[algorithm_value] = OptimizedTreeBuilder(AlgorithmType(algorithm_value), AdvancedMemoizationTable())
+    return builder, data
+
+
+def _evaluate_features_in_worker(spec: dict, algorithm_value: str, rows: np.ndarray, features: list, parent_metric: float, sorted_index: Optional[Dict[str, np.ndarray]], settings: dict) -> list:
+    """Ponto de entrada dos processos: avalia um lote de atributos sobre o dataset compartilhado."""
+    builder, data = _worker_builder(spec, algorithm_value)
+    builder.__dict__.update(settings)
+    return builder._evaluate_features(data, rows, features, parent_metric, sorted_index)
+
+
+def _build_subtrees_in_worker(spec: dict, algorithm_value: str, tasks: list, max_depth: int, settings: dict) -> list:
+    """Ponto de entrada dos processos: constrói um lote de subárvores, em série, no dataset compartilhado."""
+    builder, data = _worker_builder(spec, algorithm_value)
+    builder.__dict__.update(settings)
+    if any(task[3] is not None for task in tasks) and (builder._row_assignment is None or len(builder._row_assignment) != data.n_samples):
+        builder._row_assignment = np.empty(data.n_samples, dtype=np.intp)
+    return builder._build_subtrees(data, tasks, max_depth)
 
 
 # =====================================================================
-# 3. CONSTRUTOR DA ÁRVORE OTIMIZADO
+# 4. CONSTRUTOR DA ÁRVORE OTIMIZADO
 # =====================================================================
 
+@dataclass
+class TrainingBudget:
+    """Orçamentos do crescimento 'best_first': tempo (s), número de nós e memória (bytes)."""
+    max_time: Optional[float] = None
+    max_nodes: Optional[int] = None
+    max_memory_bytes: Optional[int] = None
+
+    # Estimativa por nó do formato de dicionários (dict, 'value' e aresta no pai)
+    NODE_BYTES = 600
+
+    def exhausted(self, elapsed: float, n_nodes: int, memory_bytes: int) -> Optional[str]:
+        if self.max_time is not None and elapsed >= self.max_time:
+            return 'time'
+        if self.max_nodes is not None and n_nodes >= self.max_nodes:
+            return 'nodes'
+        if self.max_memory_bytes is not None and memory_bytes >= self.max_memory_bytes:
+            return 'memory'
+        return None
+
+
+# Fase nula usada pelo construtor quando o perfil está desligado
+_NO_PHASE = nullcontext()
+
+
+def _json_default(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+class TrainingProfiler:
+    """Perfil opcional do treino, por nó, por atributo e por nível de profundidade."""
+
+    def __init__(self, memo_table: Optional[AdvancedMemoizationTable] = None, track_memory: bool = True):
+        self.memo_table = memo_table
+        self.track_memory = track_memory
+        self.nodes: list = []
+        self.features: Dict[str, Dict[str, Any]] = defaultdict(lambda: {'time_s': 0.0, 'partitions': 0, 'evaluations': 0})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._owns_tracemalloc = False
+
+    def start(self):
+        self._origin = time.perf_counter()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def stop(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def _cache_hits(self) -> int:
+        return sum(self.memo_table.metrics['hits'].values()) if self.memo_table is not None else 0
+
+    def start_node(self, depth: int, n_rows: int, n_features: int, kind: str = 'node') -> dict:
+        """Abre o registro de um nó (ou da passada de um nível) na thread atual."""
+        record = {
+            'id': 0, 'kind': kind, 'depth': depth, 'rows': int(n_rows), 'candidate_features': n_features, 'feature': None,
+            'partitions': 0, 'split_search_s': 0.0, 'partition_s': 0.0, 'metric_s': 0.0, 'cache_hits': 0, 'bytes_allocated': 0,
+            'thread': threading.get_ident(), 'spans': [],
+        }
+        with self._lock:
+            record['id'] = len(self.nodes)
+            self.nodes.append(record)
+        self._local.node = record
+        return record
+
+    def resume_node(self, record: dict):
+        """Volta a atribuir as fases a um nó aberto antes (fronteira do 'best_first')."""
+        self._local.node = record
+
+    @contextmanager
+    def phase(self, name: str, feature: Optional[str] = None) -> Iterator[None]:
+        """Mede uma fase do nó atual; com `feature`, o tempo vai para as somas do atributo."""
+        local = self._local
+        node = getattr(local, 'node', None)
+        outer_feature, nesting = getattr(local, 'feature', None), getattr(local, 'nesting', 0)
+        top_level = nesting == 0
+        measure_memory = top_level and self.track_memory and tracemalloc.is_tracing()
+        if top_level:
+            hits = self._cache_hits()
+            if measure_memory:
+                tracemalloc.reset_peak()
+                memory = tracemalloc.get_traced_memory()[0]
+        local.feature, local.nesting = feature or outer_feature, nesting + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            local.feature, local.nesting = outer_feature, nesting
+            if feature is not None:
+                stats = self.features[feature]
+                stats['time_s'] += elapsed
+                stats['evaluations'] += 1
+            if node is not None:
+                if feature is None:
+                    node[f'{name}_s'] += elapsed
+                node['spans'].append((name if feature is None else f'{name}:{feature}', start - self._origin, elapsed))
+                if top_level:
+                    node['cache_hits'] += self._cache_hits() - hits
+                    if measure_memory:
+                        node['bytes_allocated'] += max(0, tracemalloc.get_traced_memory()[1] - memory)
+
+    def annotate(self, **fields):
+        node = getattr(self._local, 'node', None)
+        if node is not None:
+            node.update(fields)
+
+    def count_partitions(self, n_partitions: int, seconds: float):
+        """Soma partições pontuadas e o tempo gasto nas métricas ao nó e ao atributo atuais."""
+        node = getattr(self._local, 'node', None)
+        if node is not None:
+            node['partitions'] += n_partitions
+            node['metric_s'] += seconds
+        feature = getattr(self._local, 'feature', None)
+        if feature is not None:
+            self.features[feature]['partitions'] += n_partitions
+
+    def levels(self) -> list:
+        """Somas por profundidade: nós, linhas, partições, tempos, acertos do cache e bytes."""
+        levels: Dict[int, Dict[str, Any]] = {}
+        for record in self.nodes:
+            level = levels.setdefault(record['depth'], {
+                'depth': record['depth'], 'nodes': 0, 'rows': 0, 'partitions': 0, 'split_search_s': 0.0,
+                'partition_s': 0.0, 'metric_s': 0.0, 'cache_hits': 0, 'bytes_allocated': 0,
+            })
+            if record['kind'] == 'node':
+                level['nodes'] += 1
+                level['rows'] += record['rows']
+            for key in ('partitions', 'split_search_s', 'partition_s', 'metric_s', 'cache_hits', 'bytes_allocated'):
+                level[key] += record[key]
+        return [levels[depth] for depth in sorted(levels)]
+
+    def to_dict(self) -> dict:
+        nodes = [{key: value for key, value in record.items() if key not in ('spans', 'thread')} for record in self.nodes]
+        return {'nodes': nodes, 'levels': self.levels(), 'features': {str(f): dict(stats) for f, stats in self.features.items()}}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Perfil em JSON (nós, níveis e atributos); grava em `path` se informado."""
+        text = json.dumps(self.to_dict(), indent=2, default=_json_default)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def to_chrome_trace(self, path: Optional[str] = None) -> dict:
+        """Eventos no formato de trace do Chrome (chrome://tracing, Perfetto); grava em `path` se informado."""
+        pid = os.getpid()
+        threads: Dict[int, int] = {}
+        events = []
+        for record in self.nodes:
+            if not record['spans']:
+                continue
+            tid = threads.setdefault(record['thread'], len(threads))
+            begin = min(start for _, start, _ in record['spans'])
+            end = max(start + elapsed for _, start, elapsed in record['spans'])
+            args = {key: record[key] for key in ('id', 'depth', 'rows', 'candidate_features', 'feature', 'partitions', 'metric_s', 'cache_hits', 'bytes_allocated')}
+            events.append({'name': f"{'nível' if record['kind'] == 'level' else 'nó'} {record['id']} (prof. {record['depth']})",
+                           'cat': record['kind'], 'ph': 'X', 'ts': begin * 1e6, 'dur': (end - begin) * 1e6,
+                           'pid': pid, 'tid': tid, 'args': args})
+            for name, start, elapsed in record['spans']:
+                events.append({'name': name, 'cat': 'phase', 'ph': 'X', 'ts': start * 1e6, 'dur': elapsed * 1e6, 'pid': pid, 'tid': tid})
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trace, f, default=_json_default)
+        return trace
+
+
+# Até este número de filhos a partição faz uma passada de máscara por filho; acima, usa o
+# radix sort estável do numpy sobre ids em inteiros pequenos (int8/int16).
+PARTITION_MASK_MAX_CHILDREN = 8
+# Linhas por bloco na partição por máscaras
+PARTITION_BLOCK_ROWS = 1 << 16
+
+
 class OptimizedTreeBuilder:
     """Constrói árvores com memoização e suporte a dados contínuos."""
     
-    def __init__(self, algorithm_type: AlgorithmType, memo_table: AdvancedMemoizationTable):
+    def __init__(self, algorithm_type: AlgorithmType, memo_table: AdvancedMemoizationTable, n_jobs: int = 1, parallel_backend: str = 'threads'):
         self.algorithm_type = algorithm_type
         self.memo_table = memo_table
-        
-        if self.algorithm_type == AlgorithmType.ID3:
-            self.metric_func = self.memo_table.entropy
-            self.split_eval_func = self._evaluate_split_gain
-        elif self.algorithm_type == AlgorithmType.C45:
+        if parallel_backend not in ('threads', 'processes'):
+            raise ValueError(f"Backend paralelo '{parallel_backend}' não suportado. Use 'threads' ou 'processes'.")
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+        self.parallel_backend = parallel_backend
+        self._executor: Optional[Executor] = None
+        self._shared: Optional[SharedDatasetBuffers] = None
+        # Só a thread que abriu o contexto agenda trabalho; tarefas no pool rodam em série
+        self._scheduler_thread: Optional[int] = None
+        self._task_max_samples = 0
+
+        if self.algorithm_type in (AlgorithmType.ID3, AlgorithmType.C45):
             self.metric_func = self.memo_table.entropy
-            self.split_eval_func = self._evaluate_split_gain_ratio
         elif self.algorithm_type == AlgorithmType.CART:
             self.metric_func = self.memo_table.gini_impurity
-            self.split_eval_func = self._evaluate_split_gini_reduction
         else:
             raise ValueError("Algoritmo desconhecido")
 
-    def _find_best_continuous_split(self, X: pd.DataFrame, y: pd.Series, feature: str, parent_metric: float) -> tuple[float, Optional[float]]:
-        best_metric_value = -1.0
-        best_threshold = None
-        df = pd.DataFrame({'feature': X[feature], 'target': y}).sort_values(by='feature')
-        unique_values = df['feature'].unique()
-        
-        for i in range(len(unique_values) - 1):
-            threshold = (unique_values[i] + unique_values[i+1]) / 2.0
-            left_mask = df['feature'] <= threshold
-            y_left, y_right = df['target'][left_mask], df['target'][~left_mask]
-            
-            if y_left.empty or y_right.empty:
+        # Buffer de atribuição linha -> filho usado pelo modo presort
+        self._row_assignment: Optional[np.ndarray] = None
+        # Buffers de rascunho das partições, um por thread e reaproveitados por todo o treino
+        self._scratch_buffers: Dict[int, np.ndarray] = {}
+        # Floresta aleatória: número de atributos sorteados por nó (None = todos) e o gerador
+        self.max_features: Optional[int] = None
+        self.rng: Optional[np.random.Generator] = None
+        # Limites de divisão: amostras mínimas no nó e ganho mínimo do critério (ganho, razão de ganho ou redução de Gini)
+        self.min_samples_split = 2
+        self.min_impurity_decrease = 0.0
+        # Categóricos: 'multiway' (um filho por valor) ou 'binary' (ordenação de Breiman), e o
+        # mínimo de amostras por valor no nó abaixo do qual ele vai para o grupo "outros" (0 = desligado)
+        self.categorical_split = 'multiway'
+        self.min_category_samples = 0
+        # Perfil por nó (ver `TrainingProfiler`); None desliga a instrumentação
+        self.profiler: Optional[TrainingProfiler] = None
+
+    @contextmanager
+    def parallel_context(self, data: EncodedDataset) -> Iterator[None]:
+        """Mantém o pool (e, com processos, a memória compartilhada) vivo durante um treino."""
+        if self.n_jobs == 1:
+            yield
+            return
+        if self.parallel_backend == 'processes':
+            self._shared = SharedDatasetBuffers(data)
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+        self._scheduler_thread = threading.get_ident()
+        # Subárvores maiores que isto ainda são expandidas pela thread agendadora, para gerar
+        # pelo menos ~4 tarefas por worker
+        self._task_max_samples = max(PARALLEL_MIN_SUBTREE_SAMPLES, data.n_samples // (4 * self.n_jobs))
+        try:
+            yield
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+            self._scheduler_thread = None
+            if self._shared is not None:
+                self._shared.close()
+                self._shared = None
+
+    def _is_scheduler(self) -> bool:
+        return self._executor is not None and threading.get_ident() == self._scheduler_thread
+
+    def _build_subtrees(self, data: EncodedDataset, tasks: list, max_depth: int) -> list:
+        return [self.build_tree(data, rows, features, depth, max_depth, sorted_index) for rows, features, depth, sorted_index in tasks]
+
+    def _submit_subtrees(self, data: EncodedDataset, tasks: list, max_depth: int) -> Future:
+        if self._shared is not None:
+            return self._executor.submit(_build_subtrees_in_worker, self._shared.spec, self.algorithm_type.value, tasks, max_depth, self.split_settings())
+        return self._executor.submit(self._build_subtrees, data, tasks, max_depth)
+
+    def _schedule_subtrees(self, data: EncodedDataset, tasks: list, max_depth: int) -> list:
+        """Constrói os filhos de um nó em linha ou como tarefas independentes no pool."""
+        if not self._is_scheduler():
+            return self._build_subtrees(data, tasks, max_depth)
+        subtrees = [None] * len(tasks)
+        batch, batch_positions, batch_samples = [], [], 0
+        for position, task in enumerate(tasks):
+            if task[0].size > self._task_max_samples:
+                rows, features, depth, sorted_index = task
+                subtrees[position] = self.build_tree(data, rows, features, depth, max_depth, sorted_index)
                 continue
-            metric_value = self.split_eval_func(parent_metric, y, [y_left, y_right])
-            if metric_value > best_metric_value:
-                best_metric_value = metric_value
-                best_threshold = threshold
-        return best_metric_value, best_threshold
-
-    def _evaluate_split_gain(self, parent_metric: float, y: pd.Series, subsets_y: list) -> float:
-        n = len(y)
-        if n == 0: return 0.0
-        weighted_child_metric = sum((len(subset) / n) * self.metric_func(subset, self.algorithm_type) for subset in subsets_y)
-        return parent_metric - weighted_child_metric
-    
-    def _evaluate_split_gain_ratio(self, parent_metric: float, y: pd.Series, subsets_y: list) -> float:
-        gain = self._evaluate_split_gain(parent_metric, y, subsets_y)
-        if gain == 0: return 0.0
-        n = len(y)
-        if n == 0: return 0.0
-        props = [len(s) / n for s in subsets_y if len(s) > 0]
-        split_info = -sum(p * math.log2(p) for p in props)
-        return gain / split_info if split_info > 0 else 0.0
-
-    def _evaluate_split_gini_reduction(self, parent_metric: float, y: pd.Series, subsets_y: list) -> float:
-        return self._evaluate_split_gain(parent_metric, y, subsets_y)
-
-    def find_best_split(self, X: pd.DataFrame, y: pd.Series, features: list) -> Optional[Dict[str, Any]]:
-        best_split = {'metric': -1.0, 'feature': None, 'threshold': None}
-        parent_metric = self.metric_func(y, self.algorithm_type)
+            batch.append(task)
+            batch_positions.append(position)
+            batch_samples += task[0].size
+            if batch_samples >= PARALLEL_MIN_SUBTREE_SAMPLES:
+                future = self._submit_subtrees(data, batch, max_depth)
+                for index, batch_position in enumerate(batch_positions):
+                    subtrees[batch_position] = _PendingSubtree(future, index)
+                batch, batch_positions, batch_samples = [], [], 0
+        for batch_position, subtree in zip(batch_positions, self._build_subtrees(data, batch, max_depth)):
+            subtrees[batch_position] = subtree
+        return subtrees
+
+    @classmethod
+    def _collect_subtrees(cls, node: Union[dict, _PendingSubtree]) -> dict:
+        """Substitui as tarefas pendentes pelas subárvores prontas, mantendo a ordem dos filhos."""
+        if isinstance(node, _PendingSubtree):
+            return node.future.result()[node.index]
+        for edge, child in node.get('children', {}).items():
+            node['children'][edge] = cls._collect_subtrees(child)
+        return node
+
+    def build(self, data: EncodedDataset, rows: np.ndarray, features: list, max_depth: int = 10, sorted_index: Optional[Dict[str, np.ndarray]] = None) -> Optional[dict]:
+        """Constrói a árvore inteira; com n_jobs > 1, subárvores independentes rodam no pool."""
+        # `rows` (e `sorted_index`) é particionado no lugar: passe um array próprio.
+        with self.parallel_context(data):
+            tree = self.build_tree(data, rows, features, 0, max_depth, sorted_index)
+            return self._collect_subtrees(tree) if tree is not None else None
+
+    def continuous_features(self, X: pd.DataFrame, splitter: str = 'exact') -> list:
+        """Atributos tratados por limiar: numéricos em C4.5/CART (e em todos no modo 'hist')."""
+        if self.algorithm_type == AlgorithmType.ID3 and splitter != 'hist':
+            return []
+        return [f for f in X.columns if pd.api.types.is_numeric_dtype(X[f].dtype)]
+
+    def presort_features(self, data: EncodedDataset) -> Dict[str, np.ndarray]:
+        """Ordena cada coluna contínua uma única vez para toda a recursão (estilo SLIQ/SPRINT)."""
+        self._row_assignment = np.empty(data.n_samples, dtype=np.intp)
+        # A recursão particiona estes índices no lugar; os do cache de artefatos são só leitura
+        return {f: np.require(data.argsort(f), np.intp, ['W']) for f in data.numeric}
+
+    def _scratch(self, n: int) -> np.ndarray:
+        """Buffer de rascunho (2, >= n) da thread atual: destino da partição e ids dos filhos."""
+        thread = threading.get_ident()
+        buffer = self._scratch_buffers.get(thread)
+        if buffer is None or buffer.shape[1] < n:
+            buffer = self._scratch_buffers[thread] = np.empty((2, n), dtype=np.intp)
+        return buffer[:, :n]
+
+    def _partition_rows(self, rows: np.ndarray, child_ids: np.ndarray, n_children: int, scratch: Optional[np.ndarray] = None) -> list:
+        """Particiona `rows` no próprio buffer, por filho e preservando a ordem relativa, em tempo linear."""
+        # ids -1 vão para o começo da fatia do pai e são descartados
+        target = self._scratch(len(rows))[0] if scratch is None else scratch
+        if n_children <= PARTITION_MASK_MAX_CHILDREN:
+            # Uma passada de máscara por filho, em blocos: máscaras e índices temporários ficam limitados ao bloco
+            bounds, end = [0], 0
+            for child in range(-1, n_children):
+                for start in range(0, len(rows), PARTITION_BLOCK_ROWS):
+                    mask = child_ids[start:start + PARTITION_BLOCK_ROWS] == child
+                    begin, end = end, end + int(np.count_nonzero(mask))
+                    np.compress(mask, rows[start:start + PARTITION_BLOCK_ROWS], out=target[begin:end])
+                bounds.append(end)
+        else:
+            # A ordem do argsort (e o buffer auxiliar do radix sort) são os únicos temporários do tamanho do nó
+            small_ids = child_ids.astype(np.min_scalar_type(-n_children - 1))
+            order = np.argsort(small_ids, kind='stable')
+            np.take(rows, order, out=target)
+            bounds = [0] + np.searchsorted(small_ids[order], np.arange(-1, n_children), side='right').tolist()
+        rows[:] = target
+        return [rows[bounds[i + 1]:bounds[i + 2]] for i in range(n_children)]
+
+    def _partition_sorted_index(self, sorted_index: Dict[str, np.ndarray], rows: np.ndarray, child_ids: np.ndarray, n_children: int, features: list) -> list:
+        """Deriva a ordenação de cada filho a partir da do pai, em tempo linear no tamanho do nó."""
+        # Deve rodar antes de `_partition_rows`, enquanto `child_ids` está alinhado a `rows`.
+        assignment = self._row_assignment
+        assignment[rows] = child_ids
+        target, order_ids = self._scratch(len(rows))
+        children = [{} for _ in range(n_children)]
+        for feature in features:
+            order = sorted_index.get(feature)
+            if order is None:
+                continue
+            np.take(assignment, order, out=order_ids)
+            for child_index, child_order in zip(children, self._partition_rows(order, order_ids, n_children, target)):
+                child_index[feature] = child_order
+        return children
+
+    def _find_best_continuous_split(self, data: EncodedDataset, rows: np.ndarray, feature: str, parent_metric: float, order: Optional[np.ndarray] = None) -> tuple[float, Optional[float]]:
+        """Ordena a coluna uma única vez (ou usa `order` do presort) e varre os limiares."""
+        if order is None:
+            order = rows[np.argsort(data.numeric[feature][rows], kind='mergesort')]
+        return self._scan_sorted_split(data.numeric[feature][order], data.y_codes[order], data.n_classes, parent_metric)
+
+    def _scan_sorted_split(self, sorted_values: np.ndarray, sorted_codes: np.ndarray, n_classes: int, parent_metric: float) -> tuple[float, Optional[float]]:
+        """Avalia todos os limiares candidatos de uma coluna ordenada em uma única passada vetorizada."""
+        n = len(sorted_values)
+        boundaries = np.flatnonzero(sorted_values[1:] != sorted_values[:-1])
+        if boundaries.size == 0:
+            return -1.0, None
+        thresholds = (sorted_values[boundaries] + sorted_values[boundaries + 1]) / 2.0
+        # A contagem à esquerda usa a mesma regra `<=` do particionamento (inclusive em
+        # arredondamentos do ponto médio); NaN fica sempre à direita, como na comparação.
+        valid = ~pd.isna(thresholds)
+        thresholds = thresholds[valid]
+        left_sizes = np.searchsorted(sorted_values, thresholds, side='right')
+        valid = (left_sizes > 0) & (left_sizes < n)
+        if not valid.any():
+            return -1.0, None
+        thresholds, left_sizes = thresholds[valid], left_sizes[valid]
+
+        one_hot = np.zeros((n, n_classes), dtype=np.int64)
+        one_hot[np.arange(n), sorted_codes] = 1
+        cumulative = np.cumsum(one_hot, axis=0)
+        left_counts = cumulative[left_sizes - 1]
+        right_counts = cumulative[-1] - left_counts
+
+        scores = self._score_children_counts(parent_metric, np.stack([left_counts, right_counts], axis=1))
+        best = int(np.argmax(scores))
+        return float(scores[best]), thresholds[best]
+
+    def _impurity_from_counts(self, counts: np.ndarray) -> np.ndarray:
+        """Entropia ou Gini calculados diretamente de vetores de contagem por classe (último eixo)."""
+        totals = counts.sum(axis=-1, keepdims=True)
+        probs = np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+        if self.algorithm_type == AlgorithmType.CART:
+            return 1 - np.sum(probs**2, axis=-1)
+        log_probs = np.log2(probs, out=np.zeros(probs.shape), where=probs > 0)
+        return -np.sum(probs * log_probs, axis=-1)
+
+    def _score_children_counts(self, parent_metric: float, children_counts: np.ndarray) -> np.ndarray:
+        """Ganho, razão de ganho ou redução de Gini para lotes de partições."""
+        if self.profiler is not None:
+            start = time.perf_counter()
+            scores = self._score_partitions(parent_metric, children_counts)
+            self.profiler.count_partitions(len(children_counts), time.perf_counter() - start)
+            return scores
+        return self._score_partitions(parent_metric, children_counts)
+
+    def _score_partitions(self, parent_metric: float, children_counts: np.ndarray) -> np.ndarray:
+        sizes = children_counts.sum(axis=-1)
+        n = sizes.sum(axis=-1, keepdims=True)
+        weights = np.divide(sizes, n, out=np.zeros(sizes.shape), where=n > 0)
+        gain = parent_metric - np.sum(weights * self._impurity_from_counts(children_counts), axis=-1)
+        if self.algorithm_type != AlgorithmType.C45:
+            return gain
+        log_weights = np.log2(weights, out=np.zeros(weights.shape), where=weights > 0)
+        split_info = -np.sum(weights * log_weights, axis=-1)
+        ratio = np.divide(gain, split_info, out=np.zeros(gain.shape), where=split_info > 0)
+        return np.where(gain == 0, 0.0, ratio)
+
+    def _score_categorical_tables(self, parent_metric: float, tables: list) -> np.ndarray:
+        """Pontua divisões múltiplas (um filho por valor presente) de vários atributos de uma vez."""
+        if not tables:
+            return np.empty(0)
+        # Linhas de contagem zero (valores ausentes no nó) não alteram ganho nem split info
+        padded = np.zeros((len(tables), max(len(t) for t in tables), tables[0].shape[1]), dtype=np.int64)
+        for i, table in enumerate(tables):
+            padded[i, :len(table)] = table
+        return self._score_children_counts(parent_metric, padded)
+
+    def _evaluate_features(self, data: EncodedDataset, rows: np.ndarray, features: list, parent_metric: float, sorted_index: Optional[Dict[str, np.ndarray]] = None, tables: Optional[Dict[str, np.ndarray]] = None) -> list:
+        """(métrica, limiar) de cada atributo, na ordem de `features`."""
+        categorical = [f for f in features if f in data.categories]
+        if tables is None:
+            tables = data.contingency_tables(rows, categorical)
+        if self.groups_categories:
+            categorical_scores = {}
+            for feature in categorical:
+                with self._phase('scan', feature):
+                    categorical_scores[feature] = self._categorical_groups(tables[feature], parent_metric)[0]
+        else:
+            categorical_scores = dict(zip(categorical, self._score_categorical_tables(parent_metric, [tables[f] for f in categorical])))
+        results = []
         for feature in features:
-            current_metric, current_threshold = -1.0, None
-            if pd.api.types.is_numeric_dtype(X[feature].dtype) and self.algorithm_type in [AlgorithmType.C45, AlgorithmType.CART]:
-                current_metric, current_threshold = self._find_best_continuous_split(X, y, feature, parent_metric)
+            if feature in data.numeric:
+                order = sorted_index.get(feature) if sorted_index is not None else None
+                with self._phase('scan', feature):
+                    results.append(self._find_best_continuous_split(data, rows, feature, parent_metric, order))
             else:
-                subsets_y = [y[X[feature] == val] for val in X[feature].unique()]
-                current_metric = self.split_eval_func(parent_metric, y, subsets_y)
+                results.append((float(categorical_scores[feature]), None))
+        return results
+
+    def _evaluate_features_batched(self, data: EncodedDataset, rows: np.ndarray, features: list, parent_metric: float, sorted_index: Optional[Dict[str, np.ndarray]] = None, tables: Optional[Dict[str, np.ndarray]] = None) -> list:
+        """Divide os atributos em um lote contíguo por worker; nós pequenos ficam em série."""
+        if tables is not None or not self._is_scheduler() or len(features) < 2 or rows.size * len(features) < PARALLEL_MIN_CELLS:
+            return self._evaluate_features(data, rows, features, parent_metric, sorted_index, tables)
+        batches = [list(batch) for batch in np.array_split(np.asarray(features, dtype=object), min(self.n_jobs, len(features)))]
+        if self._shared is not None:
+            futures = [
+                self._executor.submit(
+                    _evaluate_features_in_worker, self._shared.spec, self.algorithm_type.value, rows, batch, parent_metric,
+                    {f: sorted_index[f] for f in batch if f in sorted_index} if sorted_index is not None else None,
+                    self.split_settings(),
+                )
+                for batch in batches
+            ]
+        else:
+            futures = [self._executor.submit(self._evaluate_features, data, rows, batch, parent_metric, sorted_index) for batch in batches]
+        return [result for future in futures for result in future.result()]
+
+    def split_settings(self) -> dict:
+        """Limites e opções de divisão, repassados aos construtores dos processos de trabalho."""
+        return {
+            'min_samples_split': self.min_samples_split, 'min_impurity_decrease': self.min_impurity_decrease,
+            'categorical_split': self.categorical_split, 'min_category_samples': self.min_category_samples,
+        }
+
+    @property
+    def groups_categories(self) -> bool:
+        return self.categorical_split == 'binary' or self.min_category_samples > 0
+
+    def _categorical_groups(self, table: np.ndarray, parent_metric: float) -> tuple[float, np.ndarray, int]:
+        """(métrica, grupo de cada código ou -1, número de grupos) de um atributo categórico no nó."""
+        sizes = table.sum(axis=1)
+        present = np.flatnonzero(sizes)
+        group = np.full(len(table), -1, dtype=np.intp)
+        rare = present[sizes[present] < self.min_category_samples]
+        frequent = present[sizes[present] >= self.min_category_samples]
+        group[frequent] = np.arange(len(frequent))
+        group[rare] = len(frequent)
+        n_groups = len(frequent) + (1 if rare.size else 0)
+        grouped = np.zeros((n_groups, table.shape[1]), dtype=np.int64)
+        np.add.at(grouped, group[present], table[present])
+        if self.categorical_split == 'binary' and n_groups > 2:
+            majority = int(np.argmax(grouped.sum(axis=0)))
+            order = np.argsort(grouped[:, majority] / grouped.sum(axis=1), kind='stable')
+            left = np.cumsum(grouped[order], axis=0)[:-1]
+            scores = self._score_children_counts(parent_metric, np.stack([left, grouped.sum(axis=0) - left], axis=1))
+            cut = int(np.argmax(scores))
+            side = np.ones(n_groups, dtype=np.intp)
+            side[order[:cut + 1]] = 0
+            group[present] = side[group[present]]
+            return float(scores[cut]), group, 2
+        return float(self._score_children_counts(parent_metric, grouped[np.newaxis])[0]), group, n_groups
+
+    def _phase(self, name: str, feature: Optional[str] = None):
+        return self.profiler.phase(name, feature) if self.profiler is not None else _NO_PHASE
+
+    def _can_split(self, class_counts: np.ndarray, features: list, depth: int, max_depth: int) -> bool:
+        return (np.count_nonzero(class_counts) > 1 and bool(features) and depth < max_depth
+                and class_counts.sum() >= self.min_samples_split)
+
+    def _accept_split(self, best_split: Optional[Dict[str, Any]]) -> bool:
+        return best_split is not None and best_split['metric'] >= self.min_impurity_decrease
+
+    def find_best_split(self, data: EncodedDataset, rows: np.ndarray, features: list, class_counts: np.ndarray, sorted_index: Optional[Dict[str, np.ndarray]] = None, tables: Optional[Dict[str, np.ndarray]] = None) -> Optional[Dict[str, Any]]:
+        best_split = {'metric': -1.0, 'feature': None, 'threshold': None}
+        if self.max_features is not None and len(features) > self.max_features:
+            features = [features[i] for i in np.sort(self.rng.choice(len(features), self.max_features, replace=False))]
+        parent_metric = self.metric_func(class_counts, self.algorithm_type)
+        results = self._evaluate_features_batched(data, rows, features, parent_metric, sorted_index, tables)
+        for feature, (current_metric, current_threshold) in zip(features, results):
             if current_metric > best_split['metric']:
                 best_split = {'metric': current_metric, 'feature': feature, 'threshold': current_threshold}
         return best_split if best_split['metric'] > 0 else None
 
-    def build_tree(self, X: pd.DataFrame, y: pd.Series, features: list, depth: int = 0, max_depth: int = 10) -> Optional[dict]:
-        if y.empty:
-            return None
-        class_distribution = y.value_counts().to_dict()
-        parent_majority_class = y.mode()[0]
-        if len(y.unique()) == 1 or not features or depth >= max_depth:
-            return {'leaf_value': parent_majority_class, 'samples': len(y), 'value': class_distribution}
-        best_split = self.find_best_split(X, y, features)
-        if not best_split:
-            return {'leaf_value': parent_majority_class, 'samples': len(y), 'value': class_distribution}
+    def _leaf_from_counts(self, classes: np.ndarray, class_counts: np.ndarray) -> dict:
+        order = np.argsort(-class_counts, kind='stable')
+        value = {classes[i]: int(class_counts[i]) for i in order if class_counts[i] > 0}
+        return {'leaf_value': classes[int(np.argmax(class_counts))], 'samples': int(class_counts.sum()), 'value': value}
+
+    def _categorical_children(self, data: EncodedDataset, rows: np.ndarray, feature: str) -> tuple[list, np.ndarray, int]:
+        """Arestas (valores brutos, na ordem de aparição no nó) e o filho de cada linha."""
+        node_codes = data.codes(feature)[rows]
+        if self.groups_categories:
+            k = data.n_classes
+            table = np.bincount(node_codes.astype(np.intp) * k + data.y_codes[rows], minlength=data.n_values(feature) * k).reshape(-1, k)
+            _, group, n_groups = self._categorical_groups(table, self.metric_func(table.sum(axis=0), self.algorithm_type))
+            values = data.categories[feature]
+            edges = [tuple(values[group == g]) for g in range(n_groups)]
+            return [edge[0] if len(edge) == 1 else edge for edge in edges], group[node_codes], n_groups
+        present, first_seen = np.unique(node_codes, return_index=True)
+        present = present[np.argsort(first_seen)]
+        position = np.full(data.n_values(feature), -1, dtype=np.intp)
+        position[present] = np.arange(len(present))
+        return list(data.categories[feature][present]), position[node_codes], len(present)
+
+    def _split_node(self, data: EncodedDataset, rows: np.ndarray, best_split: Dict[str, Any], leaf: dict) -> tuple[dict, list, np.ndarray]:
+        """Cria o nó interno da divisão escolhida e o filho de cada linha (-1 para nenhum)."""
         feature = best_split['feature']
         threshold = best_split.get('threshold')
-        remaining_features = [f for f in features if f != feature]
         tree = {
             'feature': feature, 'threshold': threshold if threshold is not None else 'Categórico',
-            'samples': len(y), 'value': class_distribution, 'children': {}
+            'samples': leaf['samples'], 'value': leaf['value'], 'children': {}
         }
         if threshold is not None:
-            left_mask = X[feature] <= threshold
-            right_mask = X[feature] > threshold
-            left_subtree = self.build_tree(X.loc[left_mask], y.loc[left_mask], remaining_features, depth + 1, max_depth)
-            tree['children']['<='] = left_subtree or {'leaf_value': parent_majority_class, 'samples': 0, 'value': {}}
-            right_subtree = self.build_tree(X.loc[right_mask], y.loc[right_mask], remaining_features, depth + 1, max_depth)
-            tree['children']['>'] = right_subtree or {'leaf_value': parent_majority_class, 'samples': 0, 'value': {}}
+            # NaN não satisfaz nenhuma das comparações e fica fora dos dois filhos
+            values = data.numeric[feature][rows]
+            edges = ['<=', '>']
+            child_ids = np.where(values <= threshold, 0, np.where(values > threshold, 1, -1))
+        else:
+            edges, child_ids, _ = self._categorical_children(data, rows, feature)
+        return tree, edges, child_ids
+
+    def _level_sorted_segments(self, data: EncodedDataset, feature: str, active: np.ndarray, node_of_row: np.ndarray, bounds: np.ndarray, sorted_index: Optional[Dict[str, np.ndarray]]) -> list:
+        """Linhas de cada nó da fronteira em ordem crescente de `feature`, com uma ordenação por nível."""
+        if sorted_index is not None:
+            order = sorted_index[feature]
+            order = order[node_of_row[order] >= 0]
+            order = order[np.argsort(node_of_row[order], kind='stable')]
         else:
-            for value in X[feature].unique():
-                mask = X[feature] == value
-                subtree = self.build_tree(X.loc[mask], y.loc[mask], remaining_features, depth + 1, max_depth)
-                tree['children'][value] = subtree or {'leaf_value': parent_majority_class, 'samples': 0, 'value': {}}
+            order = active[np.lexsort((data.numeric[feature][active], node_of_row[active]))]
+        return np.split(order, bounds)
+
+    def build_tree_levelwise(self, data: EncodedDataset, rows: np.ndarray, features: list, max_depth: int = 10, sorted_index: Optional[Dict[str, np.ndarray]] = None) -> Optional[dict]:
+        """Constrói a árvore nível a nível, com uma passada de particionamento por nível."""
+        if rows.size == 0:
+            return None
+        k = data.n_classes
+        node_of_row = np.full(data.n_samples, -1, dtype=np.intp)
+        node_of_row[rows] = 0
+        root = None
+        # Fronteira: (atributos restantes, nó pai, aresta no pai, classe majoritária do pai)
+        frontier = [(features, None, None, None)]
+        depth = 0
+        while frontier:
+            n_nodes = len(frontier)
+            candidates = [f for f in data.feature_names if any(f in node[0] for node in frontier)] if depth < max_depth else []
+            active = np.flatnonzero(node_of_row >= 0)
+            if self.profiler is not None:
+                self.profiler.start_node(depth, active.size, len(candidates), kind='level')
+            with self._phase('partition'):
+                node_ids = node_of_row[active]
+                sizes = np.bincount(node_ids, minlength=n_nodes)
+                bounds = np.cumsum(sizes)[:-1]
+                node_rows = np.split(active[np.argsort(node_ids, kind='stable')], bounds)
+                class_counts = np.bincount(node_ids * k + data.y_codes[active], minlength=n_nodes * k).reshape(n_nodes, k)
+            with self._phase('split_search'):
+                tables = data.contingency_tables(active, [f for f in candidates if f in data.categories], node_ids, n_nodes)
+                segments = {f: self._level_sorted_segments(data, f, active, node_of_row, bounds, sorted_index) for f in candidates if f in data.numeric}
+
+            next_frontier = []
+            for node_id, (node_features, parent, edge, fallback_class) in enumerate(frontier):
+                node_rows_i = node_rows[node_id]
+                if node_rows_i.size == 0:
+                    node = {'leaf_value': fallback_class, 'samples': 0, 'value': {}}
+                else:
+                    if self.profiler is not None:
+                        self.profiler.start_node(depth, node_rows_i.size, len(node_features))
+                    counts = class_counts[node_id]
+                    node = self._leaf_from_counts(data.classes, counts)
+                    best_split = None
+                    if self._can_split(counts, node_features, depth, max_depth):
+                        node_tables = {f: tables[f][node_id] for f in node_features if f in tables}
+                        node_segments = {f: segments[f][node_id] for f in node_features if f in segments}
+                        with self._phase('split_search'):
+                            best_split = self.find_best_split(data, node_rows_i, node_features, counts, node_segments, node_tables)
+                    node_of_row[node_rows_i] = -1
+                    if self._accept_split(best_split):
+                        leaf = node
+                        if self.profiler is not None:
+                            self.profiler.annotate(feature=best_split['feature'])
+                        with self._phase('partition'):
+                            node, edges, child_ids = self._split_node(data, node_rows_i, best_split, leaf)
+                            remaining_features = [f for f in node_features if f != best_split['feature']]
+                            base = len(next_frontier)
+                            node_of_row[node_rows_i] = np.where(child_ids >= 0, base + child_ids, -1)
+                        for child_edge in edges:
+                            node['children'][child_edge] = None
+                            next_frontier.append((remaining_features, node, child_edge, leaf['leaf_value']))
+                if parent is None:
+                    root = node
+                else:
+                    parent['children'][edge] = node
+            frontier = next_frontier
+            depth += 1
+        return root
+
+    def build_tree_best_first(self, data: EncodedDataset, rows: np.ndarray, features: list, max_depth: int = 10,
+                              budget: Optional[TrainingBudget] = None) -> tuple[Optional[dict], Dict[str, Any]]:
+        """Constrói a árvore expandindo primeiro os nós de maior ganho, até o orçamento acabar."""
+        budget = budget or TrainingBudget()
+        start = time.perf_counter()
+        if rows.size == 0:
+            return None, {'budget_stop_reason': None, 'budget_nodes': 0, 'budget_elapsed_s': 0.0, 'budget_memory_bytes': 0, 'budget_frontier_left': 0}
+        frontier, counter = [], 0
+        # Os nós da fronteira são fatias de `rows`: o buffer de índices é contado uma vez só
+        rows_bytes = rows.nbytes
+
+        def push(node_rows: np.ndarray, node_features: list, depth: int, parent: Optional[dict], edge: Any):
+            nonlocal counter
+            record = self.profiler.start_node(depth, node_rows.size, len(node_features)) if self.profiler is not None else None
+            class_counts = np.bincount(data.y_codes[node_rows], minlength=data.n_classes)
+            leaf = self._leaf_from_counts(data.classes, class_counts)
+            if parent is not None:
+                parent['children'][edge] = leaf
+            best_split = None
+            if self._can_split(class_counts, node_features, depth, max_depth):
+                with self._phase('split_search'):
+                    best_split = self.find_best_split(data, node_rows, node_features, class_counts)
+            if self._accept_split(best_split):
+                heapq.heappush(frontier, (-best_split['metric'] * node_rows.size, counter, node_rows, node_features, depth, best_split, leaf, parent, edge, record))
+                counter += 1
+            return leaf
+
+        root = push(rows, features, 0, None, None)
+        n_nodes, stop_reason = 1, None
+        while frontier:
+            memory = rows_bytes + self.memo_table.stats()['cache_resident_bytes'] + n_nodes * TrainingBudget.NODE_BYTES
+            exhausted = budget.exhausted(time.perf_counter() - start, n_nodes, memory)
+            if exhausted:
+                stop_reason = exhausted
+                break
+            _, _, node_rows, node_features, depth, best_split, leaf, parent, edge, record = heapq.heappop(frontier)
+            if record is not None:
+                self.profiler.resume_node(record)
+            with self._phase('partition'):
+                tree, edges, child_ids = self._split_node(data, node_rows, best_split, leaf)
+            if budget.max_nodes is not None and n_nodes + len(edges) > budget.max_nodes:
+                # O limite de nós é rígido: uma divisão que o ultrapassaria deixa o nó como folha
+                stop_reason = 'nodes'
+                continue
+            if parent is None:
+                root = tree
+            else:
+                parent['children'][edge] = tree
+            if record is not None:
+                self.profiler.annotate(feature=best_split['feature'])
+            remaining_features = [f for f in node_features if f != best_split['feature']]
+            with self._phase('partition'):
+                children_rows = self._partition_rows(node_rows, child_ids, len(edges))
+            for child_edge, child_rows in zip(edges, children_rows):
+                if child_rows.size == 0:
+                    tree['children'][child_edge] = {'leaf_value': leaf['leaf_value'], 'samples': 0, 'value': {}}
+                else:
+                    push(child_rows, remaining_features, depth + 1, tree, child_edge)
+            n_nodes += len(edges)
+        report = {
+            'budget_stop_reason': stop_reason, 'budget_nodes': n_nodes, 'budget_elapsed_s': time.perf_counter() - start,
+            'budget_memory_bytes': rows_bytes + self.memo_table.stats()['cache_resident_bytes'] + n_nodes * TrainingBudget.NODE_BYTES,
+            'budget_frontier_left': len(frontier),
+        }
+        return root, report
+
+    def build_tree(self, data: EncodedDataset, rows: np.ndarray, features: list, depth: int = 0, max_depth: int = 10, sorted_index: Optional[Dict[str, np.ndarray]] = None) -> Optional[dict]:
+        if rows.size == 0:
+            return None
+        if self.profiler is not None:
+            self.profiler.start_node(depth, rows.size, len(features))
+        class_counts = np.bincount(data.y_codes[rows], minlength=data.n_classes)
+        leaf = self._leaf_from_counts(data.classes, class_counts)
+        if not self._can_split(class_counts, features, depth, max_depth):
+            return leaf
+        with self._phase('split_search'):
+            best_split = self.find_best_split(data, rows, features, class_counts, sorted_index)
+        if not self._accept_split(best_split):
+            return leaf
+        with self._phase('partition'):
+            tree, edges, child_ids = self._split_node(data, rows, best_split, leaf)
+            remaining_features = [f for f in features if f != best_split['feature']]
+            n_children = len(edges)
+            child_indexes = [None] * n_children
+            if sorted_index is not None:
+                child_indexes = self._partition_sorted_index(sorted_index, rows, child_ids, n_children, remaining_features)
+            tasks = [(child_rows, remaining_features, depth + 1, child_index) for child_rows, child_index in zip(self._partition_rows(rows, child_ids, n_children), child_indexes)]
+        if self.profiler is not None:
+            self.profiler.annotate(feature=best_split['feature'])
+        for edge, subtree in zip(edges, self._schedule_subtrees(data, tasks, max_depth)):
+            tree['children'][edge] = subtree or {'leaf_value': leaf['leaf_value'], 'samples': 0, 'value': {}}
         return tree
 
+    def _hist_feature_scores(self, bin_edges: Dict[str, np.ndarray], histograms: Dict[str, np.ndarray], class_counts: np.ndarray, features: list) -> Iterator[tuple[float, str, Optional[int]]]:
+        """Melhor (métrica, atributo, bin) de cada atributo; bin None indica divisão categórica."""
+        parent_metric = self.metric_func(class_counts, self.algorithm_type)
+        for feature in features:
+            hist = histograms[feature]
+            with self._phase('scan', feature):
+                if feature in bin_edges:
+                    n_edges = len(bin_edges[feature])
+                    left = np.cumsum(hist[:n_edges], axis=0)
+                    right = class_counts - left
+                    valid = np.flatnonzero((left.sum(axis=1) > 0) & (right.sum(axis=1) > 0))
+                    if valid.size == 0:
+                        continue
+                    scores = self._score_children_counts(parent_metric, np.stack([left[valid], right[valid]], axis=1))
+                    best = int(np.argmax(scores))
+                    result = float(scores[best]), feature, int(valid[best])
+                else:
+                    present = hist[hist.sum(axis=1) > 0]
+                    result = float(self._score_children_counts(parent_metric, present[np.newaxis])[0]), feature, None
+            yield result
+
+    def find_best_split_hist(self, data: EncodedDataset, histograms: Dict[str, np.ndarray], class_counts: np.ndarray, features: list) -> Optional[Dict[str, Any]]:
+        """Escolhe a melhor divisão a partir dos histogramas do nó, sem revisitar as linhas."""
+        best_split = {'metric': -1.0, 'feature': None, 'threshold': None, 'bin': None}
+        for current_metric, feature, current_bin in self._hist_feature_scores(data.bin_edges, histograms, class_counts, features):
+            if current_metric > best_split['metric']:
+                threshold = data.bin_edges[feature][current_bin] if current_bin is not None else None
+                best_split = {'metric': current_metric, 'feature': feature, 'threshold': threshold, 'bin': current_bin}
+        return best_split if best_split['metric'] > 0 else None
+
+    def build_tree_hist(self, data: EncodedDataset, rows: np.ndarray, features: list, depth: int = 0, max_depth: int = 10, histograms: Optional[Dict[str, np.ndarray]] = None) -> dict:
+        """Constrói a árvore no modo 'hist', com o truque da subtração de histogramas."""
+        if self.profiler is not None:
+            self.profiler.start_node(depth, rows.size, len(features))
+        if histograms is None:
+            with self._phase('split_search'):
+                histograms = data.contingency_tables(rows, features)
+        class_counts = np.bincount(data.y_codes[rows], minlength=data.n_classes)
+        leaf = self._leaf_from_counts(data.classes, class_counts)
+        if not self._can_split(class_counts, features, depth, max_depth):
+            return leaf
+        with self._phase('split_search'):
+            best_split = self.find_best_split_hist(data, histograms, class_counts, features)
+        if not self._accept_split(best_split):
+            return leaf
+        feature = best_split['feature']
+        if self.profiler is not None:
+            self.profiler.annotate(feature=feature)
+        remaining_features = [f for f in features if f != feature]
+        with self._phase('partition'):
+            node_codes = data.codes(feature)[rows]
+            if best_split['bin'] is not None:
+                edges, n_children = ['<=', '>'], 2
+                child_ids = (node_codes > best_split['bin']).astype(np.intp)
+            else:
+                sizes = np.bincount(node_codes, minlength=data.n_values(feature))
+                present = np.flatnonzero(sizes)
+                edges, n_children = list(data.categories[feature][present]), len(present)
+                position = np.full(len(sizes), -1, dtype=np.intp)
+                position[present] = np.arange(n_children)
+                child_ids = position[node_codes]
+            children_rows = self._partition_rows(rows, child_ids, n_children)
+
+            # Truque da subtração: o filho maior herda o histograma do pai menos os irmãos
+            largest = int(np.argmax([len(r) for r in children_rows]))
+            children_hists = [None] * n_children
+            remainder = {f: histograms[f].copy() for f in remaining_features}
+            for i, child_rows in enumerate(children_rows):
+                if i != largest:
+                    children_hists[i] = data.contingency_tables(child_rows, remaining_features)
+                    for f in remaining_features:
+                        remainder[f] -= children_hists[i][f]
+            children_hists[largest] = remainder
+
+        tree = {
+            'feature': feature, 'threshold': best_split['threshold'] if best_split['bin'] is not None else 'Categórico',
+            'samples': leaf['samples'], 'value': leaf['value'], 'children': {}
+        }
+        for edge, child_rows, child_hists in zip(edges, children_rows, children_hists):
+            tree['children'][edge] = self.build_tree_hist(data, child_rows, remaining_features, depth + 1, max_depth, child_hists)
+        return tree
+
+    def build_tree_stream(self, schema: EncodedDataset, chunks: Callable[[], Iterator[EncodedDataset]], max_depth: int = 10) -> dict:
+        """Constrói a árvore fora da memória, nível a nível, com uma passada pelos blocos por nível."""
+        k = schema.n_classes
+        n_categorical = len(schema.categorical_features)
+        column = {f: schema._categorical_column[f] if f in schema._categorical_column else n_categorical + schema._bin_column[f]
+                  for f in schema.feature_names}
+        # Roteamento por nó global: coluna da matriz de códigos e início da faixa em `table` (-1 = não dividido)
+        route_column, route_offset, table = [-1], [-1], []
+        root = None
+        # Fronteira: (id global, atributos restantes, nó pai, aresta no pai, contagens por classe ou None)
+        frontier = [(0, schema.feature_names, None, None, None)]
+        depth = 0
+        while frontier:
+            n_nodes = len(frontier)
+            splittable = [depth < max_depth and bool(node_features) if counts is None else self._can_split(counts, node_features, depth, max_depth)
+                          for _, node_features, _, _, counts in frontier]
+            candidates = [f for f in schema.feature_names if any(ok and f in node[1] for ok, node in zip(splittable, frontier))]
+            tables = {f: np.zeros((n_nodes, schema.n_values(f), k), dtype=np.int64) for f in candidates}
+            class_counts = np.zeros((n_nodes, k), dtype=np.int64)
+            if candidates or any(node[4] is None for node in frontier):
+                slot = np.full(len(route_column), -1, dtype=np.intp)
+                slot[[node[0] for node in frontier]] = np.arange(n_nodes)
+                columns, offsets, flat_table = np.array(route_column), np.array(route_offset), np.array(table, dtype=np.intp)
+                for chunk in chunks():
+                    codes = np.hstack((chunk.categorical_codes, chunk.bin_codes)).astype(np.intp)
+                    node_of_row = np.zeros(chunk.n_samples, dtype=np.intp)
+                    active = np.arange(chunk.n_samples)
+                    while active.size:
+                        active = active[columns[node_of_row[active]] >= 0]
+                        nodes = node_of_row[active]
+                        node_of_row[active] = flat_table[offsets[nodes] + codes[active, columns[nodes]]]
+                    frontier_of_row = slot[node_of_row]
+                    rows = np.flatnonzero(frontier_of_row >= 0)
+                    node_ids = frontier_of_row[rows]
+                    class_counts += np.bincount(node_ids * k + chunk.y_codes[rows], minlength=n_nodes * k).reshape(n_nodes, k)
+                    for feature, chunk_table in chunk.contingency_tables(rows, candidates, node_ids, n_nodes).items():
+                        tables[feature] += chunk_table
+
+            next_frontier = []
+            for i, (node_id, node_features, parent, edge, counts) in enumerate(frontier):
+                counts = class_counts[i] if counts is None else counts
+                node = self._leaf_from_counts(schema.classes, counts)
+                best_split = None
+                if splittable[i] and self._can_split(counts, node_features, depth, max_depth):
+                    best_split = self.find_best_split_hist(schema, {f: tables[f][i] for f in node_features}, counts, node_features)
+                if self._accept_split(best_split):
+                    leaf, feature = node, best_split['feature']
+                    hist = tables[feature][i]
+                    if best_split['bin'] is not None:
+                        edges = ['<=', '>']
+                        child_counts = [hist[:best_split['bin'] + 1].sum(axis=0), hist[best_split['bin'] + 1:].sum(axis=0)]
+                        code_to_child = (np.arange(len(hist)) > best_split['bin']).astype(np.intp)
+                    else:
+                        present = np.flatnonzero(hist.sum(axis=1))
+                        edges, child_counts = list(schema.categories[feature][present]), list(hist[present])
+                        code_to_child = np.full(len(hist), -1, dtype=np.intp)
+                        code_to_child[present] = np.arange(len(present))
+                    node = {
+                        'feature': feature, 'threshold': best_split['threshold'] if best_split['bin'] is not None else 'Categórico',
+                        'samples': leaf['samples'], 'value': leaf['value'], 'children': {}
+                    }
+                    child_ids = len(route_column) + np.arange(len(edges))
+                    route_column[node_id], route_offset[node_id] = column[feature], len(table)
+                    table.extend(np.where(code_to_child >= 0, child_ids[code_to_child], -1).tolist())
+                    route_column.extend([-1] * len(edges))
+                    route_offset.extend([-1] * len(edges))
+                    remaining_features = [f for f in node_features if f != feature]
+                    for child_edge, child_id, child_count in zip(edges, child_ids, child_counts):
+                        node['children'][child_edge] = None
+                        next_frontier.append((int(child_id), remaining_features, node, child_edge, child_count))
+                if parent is None:
+                    root = node
+                else:
+                    parent['children'][edge] = node
+            frontier = next_frontier
+            depth += 1
+        return root
+
+
+class HoeffdingTreeLearner:
+    """Estado do treino incremental (`partial_fit`) no estilo Hoeffding/VFDT."""
+
+    def __init__(self, builder: OptimizedTreeBuilder, max_depth: int = 10, max_bins: int = 255,
+                 delta: float = 1e-7, grace_period: int = 200, tie_threshold: float = 0.05):
+        self.builder = builder
+        self.max_depth = max_depth
+        self.max_bins = max_bins
+        self.delta = delta
+        self.grace_period = grace_period
+        self.tie_threshold = tie_threshold
+        self.feature_names = None
+        self.n_splits = 0
+
+    def _start(self, X: pd.DataFrame):
+        self.feature_names = list(X.columns)
+        self.bin_edges = {
+            f: EncodedDataset._bin_edges(X[f].to_numpy(dtype=np.float64, na_value=np.nan), self.max_bins)
+            for f in self.feature_names if pd.api.types.is_numeric_dtype(X[f].dtype)
+        }
+        self.vocabularies = {f: pd.Index([], dtype=object) for f in self.feature_names if f not in self.bin_edges}
+        self.classes = pd.Index([], dtype=object)
+        # Nós: atributo (-1 em folhas), limiar, faixa de filhos em `table` (offset, largura), profundidade
+        self.node_feature, self.node_threshold, self.node_offset, self.node_width, self.node_depth = [], [], [], [], []
+        self.node_edges = []
+        self.table = np.empty(0, dtype=np.intp)
+        # Estatísticas das folhas desde sua criação: atributos restantes, contagens por classe, tabelas e
+        # exemplos desde a última checagem. Contagens e tabelas começam juntas do zero e vêm dos mesmos exemplos
+        self.leaf_features, self.leaf_counts, self.leaf_tables, self.leaf_pending = {}, {}, {}, {}
+        # Só para predição: distribuição herdada do pai, usada enquanto a folha não viu exemplos
+        self.leaf_prior = {}
+        # Contagens que cada nó interno recebeu enquanto era folha (entram nos totais de `to_dict`)
+        self.split_counts = {}
+        # Atributos herdados pelos filhos de cada nó interno (usados por filhos categóricos criados depois)
+        self.child_features = {}
+        self._add_leaf(0, self.feature_names, np.zeros(0, dtype=np.int64))
+
+    def _add_leaf(self, depth: int, features: list, prior: np.ndarray) -> int:
+        node = len(self.node_feature)
+        self.node_feature.append(-1)
+        self.node_threshold.append(None)
+        self.node_offset.append(-1)
+        self.node_width.append(0)
+        self.node_depth.append(depth)
+        self.node_edges.append([])
+        self.leaf_features[node], self.leaf_counts[node] = features, np.zeros(len(prior), dtype=np.int64)
+        self.leaf_tables[node], self.leaf_pending[node], self.leaf_prior[node] = {}, 0, prior
+        return node
+
+    def n_values(self, feature: str) -> int:
+        if feature in self.bin_edges:
+            return len(self.bin_edges[feature]) + 2
+        return len(self.vocabularies[feature])
+
+    @staticmethod
+    def _grow_index(index: pd.Index, values: np.ndarray) -> tuple[pd.Index, np.ndarray]:
+        codes = index.get_indexer(values)
+        if (codes < 0).any():
+            index = index.append(pd.Index(pd.unique(values[codes < 0]), dtype=object))
+            codes = index.get_indexer(values)
+        return index, codes
+
+    def _encode(self, X: pd.DataFrame, y: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """Códigos (linhas x atributos) do lote, ampliando vocabulários e classes com valores novos."""
+        codes = np.empty((len(X), len(self.feature_names)), dtype=np.intp)
+        for j, feature in enumerate(self.feature_names):
+            if feature in self.bin_edges:
+                codes[:, j] = EncodedDataset._digitize(X[feature].to_numpy(dtype=np.float64, na_value=np.nan), self.bin_edges[feature])
+            else:
+                self.vocabularies[feature], codes[:, j] = self._grow_index(self.vocabularies[feature], X[feature].to_numpy(dtype=object))
+        self.classes, y_codes = self._grow_index(self.classes, y.to_numpy(dtype=object))
+        return codes, y_codes
+
+    def _set_children(self, node: int, children: np.ndarray):
+        self.node_offset[node], self.node_width[node] = len(self.table), len(children)
+        self.table = np.concatenate((self.table, children))
+
+    def _route(self, codes: np.ndarray) -> np.ndarray:
+        """Folha de cada linha; valores categóricos ainda sem filho ganham uma folha nova."""
+        node_of_row = np.zeros(len(codes), dtype=np.intp)
+        active = np.arange(len(codes))
+        feature, offset, width = (np.asarray(a) for a in (self.node_feature, self.node_offset, self.node_width))
+        while active.size:
+            active = active[feature[node_of_row[active]] >= 0]
+            nodes = node_of_row[active]
+            row_codes = codes[active, feature[nodes]]
+            inside = row_codes < width[nodes]
+            child = np.full(active.size, -1, dtype=np.intp)
+            child[inside] = self.table[offset[nodes[inside]] + row_codes[inside]]
+            missing = np.flatnonzero(child < 0)
+            if missing.size:
+                for node, code in dict.fromkeys(zip(nodes[missing].tolist(), row_codes[missing].tolist())):
+                    self._add_categorical_child(node, code)
+                feature, offset, width = (np.asarray(a) for a in (self.node_feature, self.node_offset, self.node_width))
+                continue
+            node_of_row[active] = child
+        return node_of_row
+
+    def _add_categorical_child(self, node: int, code: int):
+        feature = self.feature_names[self.node_feature[node]]
+        children = self.table[self.node_offset[node]:self.node_offset[node] + self.node_width[node]]
+        if code >= len(children):
+            children = np.concatenate((children, np.full(len(self.vocabularies[feature]) - len(children), -1, dtype=np.intp)))
+            self._set_children(node, children)
+        child = self._add_leaf(self.node_depth[node] + 1, self.child_features[node], self.split_counts[node])
+        self.table[self.node_offset[node] + code] = child
+        self.node_edges[node].append((self.vocabularies[feature][code], child))
+
+    def partial_fit(self, X: pd.DataFrame, y: pd.Series) -> "HoeffdingTreeLearner":
+        if self.feature_names is None:
+            self._start(X)
+        codes, y_codes = self._encode(X, y)
+        k = len(self.classes)
+        leaf_of_row = self._route(codes)
+        leaves, inverse = np.unique(leaf_of_row, return_inverse=True)
+        counts = np.bincount(inverse * k + y_codes, minlength=len(leaves) * k).reshape(len(leaves), k)
+        features = {f for leaf in leaves.tolist() for f in self.leaf_features[leaf]}
+        tables = {}
+        for j, feature in enumerate(self.feature_names):
+            if feature in features:
+                n_values = self.n_values(feature)
+                keys = (inverse * n_values + codes[:, j]) * k + y_codes
+                tables[feature] = np.bincount(keys, minlength=len(leaves) * n_values * k).reshape(len(leaves), n_values, k)
+        for i, leaf in enumerate(leaves.tolist()):
+            self.leaf_counts[leaf] = self._padded(self.leaf_counts[leaf], (k,)) + counts[i]
+            for feature in self.leaf_features[leaf]:
+                shape = (self.n_values(feature), k)
+                self.leaf_tables[leaf][feature] = self._padded(self.leaf_tables[leaf].get(feature), shape) + tables[feature][i]
+            self.leaf_pending[leaf] += int(counts[i].sum())
+            if self.leaf_pending[leaf] >= self.grace_period:
+                self.leaf_pending[leaf] = 0
+                self._try_split(leaf)
+        return self
+
+    @staticmethod
+    def _padded(array: Optional[np.ndarray], shape: tuple) -> np.ndarray:
+        if array is None:
+            return np.zeros(shape, dtype=np.int64)
+        if array.shape == shape:
+            return array
+        return np.pad(array, [(0, n - m) for n, m in zip(shape, array.shape)])
+
+    def hoeffding_bound(self, n: int) -> float:
+        k = max(len(self.classes), 2)
+        if self.builder.algorithm_type == AlgorithmType.ID3:
+            criterion_range = math.log2(k)
+        elif self.builder.algorithm_type == AlgorithmType.C45:
+            # O ganho nunca passa da informação da divisão, então a razão fica em [0, 1]
+            criterion_range = 1.0
+        else:
+            criterion_range = 1.0 - 1.0 / k
+        return math.sqrt(criterion_range ** 2 * math.log(1.0 / self.delta) / (2.0 * n))
+
+    def _try_split(self, leaf: int):
+        counts, features = self.leaf_counts[leaf], self.leaf_features[leaf]
+        if self.node_depth[leaf] >= self.max_depth or not features or np.count_nonzero(counts) < 2:
+            return
+        k = len(self.classes)
+        tables = {f: self._padded(self.leaf_tables[leaf].get(f), (self.n_values(f), k)) for f in features}
+        scores = sorted(self.builder._hist_feature_scores(self.bin_edges, tables, counts, features), key=lambda s: -s[0])
+        if not scores or scores[0][0] <= 0:
+            return
+        second = scores[1][0] if len(scores) > 1 else 0.0
+        epsilon = self.hoeffding_bound(int(counts.sum()))
+        if scores[0][0] - second <= epsilon and epsilon >= self.tie_threshold:
+            return
+        _, feature, split_bin = scores[0]
+        hist, remaining = tables[feature], [f for f in features if f != feature]
+        depth = self.node_depth[leaf] + 1
+        self.node_feature[leaf] = self.feature_names.index(feature)
+        if split_bin is not None:
+            self.node_threshold[leaf] = float(self.bin_edges[feature][split_bin])
+            left = self._add_leaf(depth, remaining, hist[:split_bin + 1].sum(axis=0))
+            right = self._add_leaf(depth, remaining, hist[split_bin + 1:].sum(axis=0))
+            self._set_children(leaf, np.where(np.arange(len(hist)) <= split_bin, left, right))
+            self.node_edges[leaf] = [('<=', left), ('>', right)]
+        else:
+            present = np.flatnonzero(hist.sum(axis=1))
+            children = np.full(len(hist), -1, dtype=np.intp)
+            for code in present.tolist():
+                children[code] = self._add_leaf(depth, remaining, hist[code])
+                self.node_edges[leaf].append((self.vocabularies[feature][code], children[code]))
+            self._set_children(leaf, children)
+        self.child_features[leaf] = remaining
+        self.split_counts[leaf] = counts
+        del self.leaf_features[leaf], self.leaf_counts[leaf], self.leaf_tables[leaf], self.leaf_pending[leaf], self.leaf_prior[leaf]
+        self.n_splits += 1
+
+    def to_dict(self) -> dict:
+        """Árvore atual em dicionários; cada nó conta os exemplos recebidos como folha e os dos filhos."""
+        classes = np.empty(len(self.classes), dtype=object)
+        classes[:] = list(self.classes)
+        k = len(classes)
+        totals = {}
+        # Em ordem decrescente de id, todo filho é visitado antes do pai
+        for node in range(len(self.node_feature) - 1, -1, -1):
+            if self.node_feature[node] < 0:
+                totals[node] = self._padded(self.leaf_counts[node], (k,))
+            else:
+                totals[node] = self._padded(self.split_counts[node], (k,)) + sum(totals[child] for _, child in self.node_edges[node])
+        builder = self.builder
+
+        def build(node: int) -> dict:
+            # Folha ainda sem exemplos prevê pela distribuição herdada do pai
+            if self.node_feature[node] < 0 and totals[node].sum() == 0:
+                prior = self._padded(self.leaf_prior[node], (k,))
+                return {'leaf_value': builder._leaf_from_counts(classes, prior)['leaf_value'], 'samples': 0, 'value': {}}
+            leaf = builder._leaf_from_counts(classes, totals[node])
+            if self.node_feature[node] < 0:
+                return leaf
+            threshold = self.node_threshold[node]
+            tree = {
+                'feature': self.feature_names[self.node_feature[node]], 'threshold': threshold if threshold is not None else 'Categórico',
+                'samples': leaf['samples'], 'value': leaf['value'], 'children': {}
+            }
+            for edge, child in self.node_edges[node]:
+                tree['children'][edge] = build(child)
+            return tree
+        return build(0)
+
 
 # =====================================================================
-# 4. API PRINCIPAL UNIFICADA
+# 5. REPRESENTAÇÃO COMPACTA DA ÁRVORE
 # =====================================================================
 
+# Tipos de nó da representação compacta
+NODE_LEAF, NODE_NUMERIC, NODE_CATEGORICAL = 0, 1, 2
+
+# Formato binário: cabeçalho fixo (magic, versão, tamanho do JSON), metadados JSON e os
+# arrays de nós em little-endian, cada um alinhado em MODEL_FORMAT_ALIGNMENT bytes
+MODEL_FORMAT_MAGIC = b'ODTREE\x00\x00'
+MODEL_FORMAT_VERSION = 1
+MODEL_FORMAT_ALIGNMENT = 64
+_MODEL_HEADER = struct.Struct('<8sIQ')
+_MODEL_ARRAYS = {
+    'kind': '<i1', 'feature': '<i4', 'threshold': '<f8', 'left': '<i4', 'right': '<i4', 'child_offset': '<i4',
+    'child_table': '<i4', 'leaf_class': '<i4', 'value': '<i8', 'n_node_samples': '<i8',
+}
+
+
+# Chave única de todos os valores ausentes nos vocabulários (NaN != NaN, e cada np.float64 é um objeto novo)
+_MISSING_CATEGORY = ('<ausente>',)
+
+
+def _category_key(value: Any) -> Any:
+    return _MISSING_CATEGORY if pd.api.types.is_scalar(value) and pd.isna(value) else value
+
+
+def _labels_to_json(labels: np.ndarray) -> dict:
+    values = [v.item() if isinstance(v, np.generic) else v for v in labels.tolist()]
+    return {'dtype': labels.dtype.str if labels.dtype != object else 'object', 'values': values}
+
+
+def _labels_from_json(spec: dict) -> np.ndarray:
+    if spec['dtype'] == 'object':
+        labels = np.empty(len(spec['values']), dtype=object)
+        labels[:] = spec['values']
+        return labels
+    return np.asarray(spec['values'], dtype=spec['dtype'])
+
+
+@dataclass
+class CompactTree:
+    """Árvore ajustada em forma de struct-of-arrays, com um índice por nó em pré-ordem."""
+    # Nós categóricos apontam (`child_offset`) para uma faixa de `child_table` indexada pelo
+    # código do valor; -1 marca valor sem filho.
+    feature_names: list
+    classes: np.ndarray
+    categories: list
+    kind: np.ndarray
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    child_offset: np.ndarray
+    child_table: np.ndarray
+    leaf_class: np.ndarray
+    value: np.ndarray
+    n_node_samples: np.ndarray
+    # Pai de cada nó, calculado na primeira consulta (ver `parents`)
+    _parent: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.kind)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.kind, self.feature, self.threshold, self.left, self.right, self.child_offset,
+                  self.child_table, self.leaf_class, self.value, self.n_node_samples)
+        return sum(a.nbytes for a in arrays)
+
+    @classmethod
+    def from_dict(cls, tree: dict, feature_names: Optional[list] = None, classes: Optional[np.ndarray] = None,
+                  categories: Optional[Dict[str, np.ndarray]] = None) -> "CompactTree":
+        """Converte o formato de dicionários aninhados (`OptimizedDecisionTree.tree`)."""
+        # Pré-ordem com pilha explícita: os filhos de um nó recebem ids crescentes na ordem das arestas
+        nodes, edges_of = [], []
+        stack = [(tree, -1, None)]
+        while stack:
+            node, parent, edge = stack.pop()
+            node_id = len(nodes)
+            nodes.append(node)
+            edges_of.append([])
+            if parent >= 0:
+                edges_of[parent].append((edge, node_id))
+            if 'leaf_value' not in node:
+                for child_edge, child in reversed(list(node['children'].items())):
+                    stack.append((child, node_id, child_edge))
+
+        feature_names = list(feature_names) if feature_names is not None else []
+        if classes is None:
+            seen = {}
+            for node in nodes:
+                for label in node.get('value', {}):
+                    seen.setdefault(label, None)
+                if 'leaf_value' in node:
+                    seen.setdefault(node['leaf_value'], None)
+            classes = np.array(list(seen), dtype=object)
+        class_index = {label: i for i, label in enumerate(classes.tolist())}
+        # Vocabulário de cada atributo: chave (com os ausentes unificados) -> (código, valor bruto)
+        vocabularies: Dict[int, dict] = defaultdict(dict)
+        for feature_name, values in (categories or {}).items():
+            if feature_name in feature_names:
+                vocabularies[feature_names.index(feature_name)] = {_category_key(v): (code, v) for code, v in enumerate(values.tolist())}
+
+        n = len(nodes)
+        kind = np.zeros(n, dtype=np.int8)
+        feature = np.full(n, -1, dtype=np.int32)
+        threshold = np.full(n, np.nan)
+        left = np.full(n, -1, dtype=np.int32)
+        right = np.full(n, -1, dtype=np.int32)
+        child_offset = np.full(n, -1, dtype=np.int32)
+        leaf_class = np.zeros(n, dtype=np.int32)
+        value = np.zeros((n, len(classes)), dtype=np.int64)
+        n_node_samples = np.zeros(n, dtype=np.int64)
+        for i, node in enumerate(nodes):
+            for label, count in node.get('value', {}).items():
+                value[i, class_index[label]] = count
+            n_node_samples[i] = node.get('samples', int(value[i].sum()))
+            if 'leaf_value' in node:
+                leaf_class[i] = class_index[node['leaf_value']]
+                continue
+            if node['feature'] not in feature_names:
+                feature_names.append(node['feature'])
+            feature[i] = feature_names.index(node['feature'])
+            if node['value']:
+                leaf_class[i] = class_index[max(node['value'], key=node['value'].get)]
+            if node['threshold'] != 'Categórico':
+                kind[i] = NODE_NUMERIC
+                threshold[i] = node['threshold']
+                children = dict(edges_of[i])
+                left[i], right[i] = children.get('<=', -1), children.get('>', -1)
+            else:
+                kind[i] = NODE_CATEGORICAL
+                vocabulary = vocabularies[feature[i]]
+                for edge, _ in edges_of[i]:
+                    for raw in (edge if isinstance(edge, tuple) else (edge,)):
+                        vocabulary.setdefault(_category_key(raw), (len(vocabulary), raw))
+
+        # Tabela de filhos indexada por código: uma faixa do tamanho do vocabulário por nó
+        child_table = []
+        for i in np.flatnonzero(kind == NODE_CATEGORICAL):
+            vocabulary = vocabularies[feature[i]]
+            child_offset[i] = len(child_table)
+            row = [-1] * len(vocabulary)
+            for edge, child_id in edges_of[i]:
+                for raw in (edge if isinstance(edge, tuple) else (edge,)):
+                    row[vocabulary[_category_key(raw)][0]] = child_id
+            child_table.extend(row)
+
+        categories = [np.empty(0, dtype=object) for _ in feature_names]
+        for j, vocabulary in vocabularies.items():
+            categories[j] = np.empty(len(vocabulary), dtype=object)
+            categories[j][:] = [raw for _, raw in vocabulary.values()]
+        return cls(
+            feature_names=feature_names, classes=np.asarray(classes), categories=categories, kind=kind,
+            feature=feature, threshold=threshold, left=left, right=right, child_offset=child_offset,
+            child_table=np.asarray(child_table, dtype=np.int32), leaf_class=leaf_class, value=value,
+            n_node_samples=n_node_samples,
+        )
+
+    def _column_for_routing(self, X: pd.DataFrame, feature: int, categorical: bool) -> np.ndarray:
+        column = X[self.feature_names[feature]]
+        if categorical:
+            # Códigos no vocabulário do treino; valores não vistos viram -1 (fallback)
+            vocabulary = pd.Index(self.categories[feature])
+            codes = vocabulary.get_indexer(column).astype(np.int32)
+            if vocabulary.hasnans:
+                # Qualquer ausente (None, NaN, pd.NA) vai para o código do ausente visto no treino
+                codes[column.isna().to_numpy()] = np.flatnonzero(vocabulary.isna())[0]
+            return codes
+        return column.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def route(self, X: pd.DataFrame, roots: Optional[np.ndarray] = None) -> np.ndarray:
+        """Nó final de cada linha de `X`, roteando todas as linhas juntas, nível a nível."""
+        return self._route(len(X), lambda feature, categorical: self._column_for_routing(X, feature, categorical), roots)
+
+    def route_encoded(self, data: EncodedDataset, rows: np.ndarray) -> np.ndarray:
+        """Como `route`, mas para linhas de um EncodedDataset, sem decodificá-las em DataFrame."""
+        # A árvore deve ter sido convertida com `categories=data.categories`.
+        def column(feature: int, categorical: bool) -> np.ndarray:
+            name = self.feature_names[feature]
+            return data.codes(name)[rows].astype(np.int32) if categorical else data.numeric[name][rows]
+        return self._route(len(rows), column)
+
+    def _route(self, n: int, column_for: Callable[[int, bool], np.ndarray], roots: Optional[np.ndarray] = None) -> np.ndarray:
+        single = roots is None
+        roots = np.zeros(1, dtype=np.int32) if single else np.asarray(roots, dtype=np.int32)
+        node_of_row = np.repeat(roots, n)
+        active = np.flatnonzero(self.kind[node_of_row] != NODE_LEAF)
+        columns: Dict[tuple, np.ndarray] = {}
+        while active.size:
+            nodes = node_of_row[active]
+            child = np.full(active.size, -1, dtype=np.int32)
+            # Um grupo por (atributo, tipo de nó) presente no nível
+            group = self.feature[nodes].astype(np.int64) * 3 + self.kind[nodes]
+            for g in np.flatnonzero(np.bincount(group)).tolist():
+                feature, kind = divmod(g, 3)
+                sel = np.flatnonzero(group == g)
+                key = (feature, kind == NODE_CATEGORICAL)
+                if key not in columns:
+                    columns[key] = column_for(*key)
+                values, at = columns[key][active[sel] % n], nodes[sel]
+                if kind == NODE_NUMERIC:
+                    # NaN falha no '<=' e segue para a direita ('>')
+                    child[sel] = np.where(values <= self.threshold[at], self.left[at], self.right[at])
+                else:
+                    found = values >= 0
+                    child[sel[found]] = self.child_table[self.child_offset[at[found]] + values[found]]
+            moved = child >= 0
+            active, child = active[moved], child[moved]
+            node_of_row[active] = child
+            active = active[self.kind[child] != NODE_LEAF]
+        return node_of_row if single else node_of_row.reshape(len(roots), n)
+
+    def node_proba(self) -> np.ndarray:
+        """Distribuição de classes de cada nó; nós sem amostras recebem a classe de `leaf_class`."""
+        totals = self.value.sum(axis=1, keepdims=True)
+        proba = self.value / np.maximum(totals, 1)
+        empty = np.flatnonzero(totals[:, 0] == 0)
+        proba[empty, self.leaf_class[empty]] = 1.0
+        return proba
+
+    def parents(self) -> np.ndarray:
+        """Pai de cada nó (-1 para a raiz), montado uma vez e guardado na árvore."""
+        if self._parent is None:
+            parent = np.full(self.n_nodes, -1, dtype=np.int32)
+            parent[self.left[self.left >= 0]] = np.flatnonzero(self.left >= 0)
+            parent[self.right[self.right >= 0]] = np.flatnonzero(self.right >= 0)
+            # Dono de cada posição de `child_table`: as faixas dos nós categóricos são contíguas
+            categorical = np.flatnonzero(self.kind == NODE_CATEGORICAL)
+            categorical = categorical[np.argsort(self.child_offset[categorical], kind='stable')]
+            widths = np.diff(np.append(self.child_offset[categorical], len(self.child_table)))
+            owner = np.repeat(categorical, widths)
+            has_child = self.child_table >= 0
+            parent[self.child_table[has_child]] = owner[has_child]
+            self._parent = parent
+        return self._parent
+
+    def decision_path(self, nodes: np.ndarray) -> "sparse.csr_matrix":
+        """Matriz indicadora esparsa (linhas x nós) dos caminhos da raiz até `nodes`."""
+        # Sobe todas as linhas juntas, um nível por iteração, até passarem da raiz
+        parent = self.parents()
+        rows, cols = [], []
+        row, current = np.arange(len(nodes)), np.asarray(nodes, dtype=np.int32)
+        while current.size:
+            rows.append(row)
+            cols.append(current)
+            up = parent[current]
+            row, current = row[up >= 0], up[up >= 0]
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        # Em pré-ordem o ancestral tem id menor: colunas crescentes dão o caminho da raiz ao nó
+        order = np.lexsort((cols, rows))
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(nodes)))))
+        data = np.ones(len(cols), dtype=np.int8)
+        return sparse.csr_matrix((data, cols[order], indptr), shape=(len(nodes), self.n_nodes))
+
+    def save(self, path: str, metadata: Optional[dict] = None):
+        """Grava a árvore no formato binário versionado; `metadata` vai junto no cabeçalho JSON."""
+        arrays = {name: np.ascontiguousarray(getattr(self, name), dtype=dtype) for name, dtype in _MODEL_ARRAYS.items()}
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset += -(-array.nbytes // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+        header = json.dumps({
+            'feature_names': self.feature_names, 'classes': _labels_to_json(self.classes),
+            'categories': [_labels_to_json(np.asarray(c)) for c in self.categories],
+            'arrays': layout, 'metadata': metadata or {},
+        }).encode('utf-8')
+        data_start = -(-(_MODEL_HEADER.size + len(header)) // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+        with open(path, 'wb') as fh:
+            fh.write(_MODEL_HEADER.pack(MODEL_FORMAT_MAGIC, MODEL_FORMAT_VERSION, len(header)))
+            fh.write(header)
+            for name, array in arrays.items():
+                fh.seek(data_start + layout[name]['offset'])
+                fh.write(array.tobytes())
+            fh.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> tuple["CompactTree", dict]:
+        """Lê uma árvore gravada por `save`; com `mmap` os arrays são views somente leitura do arquivo."""
+        with open(path, 'rb') as fh:
+            magic, version, header_len = _MODEL_HEADER.unpack(fh.read(_MODEL_HEADER.size))
+            if magic != MODEL_FORMAT_MAGIC:
+                raise ValueError(f"'{path}' não é um modelo OptimizedDecisionTree.")
+            if version != MODEL_FORMAT_VERSION:
+                raise ValueError(f"Versão de formato {version} não suportada (esperada {MODEL_FORMAT_VERSION}).")
+            header = json.loads(fh.read(header_len).decode('utf-8'))
+        data_start = -(-(_MODEL_HEADER.size + header_len) // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+        buffer = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+        arrays = {}
+        for name, dtype in _MODEL_ARRAYS.items():
+            spec = header['arrays'][name]
+            if np.dtype(spec['dtype']) != np.dtype(dtype):
+                raise ValueError(f"Array '{name}' com dtype {spec['dtype']}, esperado {dtype}.")
+            start = data_start + spec['offset']
+            nbytes = int(np.prod(spec['shape'], dtype=np.int64)) * np.dtype(dtype).itemsize
+            if start + nbytes > len(buffer):
+                raise ValueError(f"Arquivo '{path}' truncado no array '{name}'.")
+            arrays[name] = buffer[start:start + nbytes].view(dtype).reshape(spec['shape'])
+        tree = cls(
+            feature_names=header['feature_names'], classes=_labels_from_json(header['classes']),
+            categories=[_labels_from_json(c) for c in header['categories']], **arrays,
+        )
+        if len(tree.value) != tree.n_nodes or tree.value.shape[1] != len(tree.classes) or tree.feature.max(initial=-1) >= len(tree.feature_names):
+            raise ValueError(f"Arrays inconsistentes em '{path}'.")
+        return tree, header['metadata']
+
+    def collapse(self, collapsed: np.ndarray) -> "CompactTree":
+        """Nova árvore em que os nós marcados em `collapsed` viram folhas (descendentes removidos)."""
+        keep = np.zeros(self.n_nodes, dtype=bool)
+        leaf = collapsed | (self.kind == NODE_LEAF)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            keep[node] = True
+            if not leaf[node]:
+                stack.extend(child for _, child in self.children_of(node))
+        # Pré-ordem preservada: o novo id é a posição entre os nós mantidos
+        new_id = np.cumsum(keep) - 1
+        old = np.flatnonzero(keep)
+
+        def remap(links: np.ndarray) -> np.ndarray:
+            return np.where(links >= 0, new_id[np.maximum(links, 0)], -1).astype(np.int32)
+        kind = np.where(leaf[old], NODE_LEAF, self.kind[old]).astype(np.int8)
+        left = np.where(kind == NODE_NUMERIC, remap(self.left[old]), -1).astype(np.int32)
+        right = np.where(kind == NODE_NUMERIC, remap(self.right[old]), -1).astype(np.int32)
+        child_offset = np.full(len(old), -1, dtype=np.int32)
+        child_table = []
+        for i in np.flatnonzero(kind == NODE_CATEGORICAL):
+            start, width = self.child_offset[old[i]], len(self.categories[self.feature[old[i]]])
+            child_offset[i] = len(child_table)
+            child_table.extend(remap(self.child_table[start:start + width]).tolist())
+        return CompactTree(
+            feature_names=self.feature_names, classes=self.classes, categories=self.categories, kind=kind,
+            feature=np.where(kind == NODE_LEAF, -1, self.feature[old]).astype(np.int32),
+            threshold=np.where(kind == NODE_NUMERIC, self.threshold[old], np.nan), left=left, right=right,
+            child_offset=child_offset, child_table=np.asarray(child_table, dtype=np.int32),
+            leaf_class=self.leaf_class[old].copy(), value=self.value[old].copy(), n_node_samples=self.n_node_samples[old].copy(),
+        )
+
+    def cost_complexity_alphas(self) -> np.ndarray:
+        """Alpha em que cada nó interno vira folha na poda de custo-complexidade (inf em folhas)."""
+        total = max(int(self.value[0].sum()), 1)
+        errors = (self.value.sum(axis=1) - self.value.max(axis=1, initial=0)) / total
+        alphas = np.full(self.n_nodes, np.inf)
+        # Por nó: (erro das folhas com alpha=0, número de folhas, eventos em ordem crescente de alpha)
+        cost = {}
+        for node in range(self.n_nodes - 1, -1, -1):
+            children = [child for _, child in self.children_of(node)]
+            if not children:
+                cost[node] = (errors[node], 1, [])
+                continue
+            base = sum(cost[c][0] for c in children)
+            leaves = sum(cost[c][1] for c in children)
+            events = sorted(e for c in children for e in cost.pop(c)[2])
+            # Percorre os segmentos de C_filhos(alpha) = base + erro somado + folhas restantes * alpha
+            err, remaining, alpha, kept = base, leaves, 0.0, 0
+            while True:
+                crossing = (errors[node] - err) / (remaining - 1) if remaining > 1 else (0.0 if errors[node] <= err else np.inf)
+                if kept == len(events) or crossing <= events[kept][0]:
+                    alpha = max(crossing, events[kept - 1][0] if kept else 0.0)
+                    break
+                _, removed, added = events[kept]
+                err, remaining, kept = err + added, remaining - removed, kept + 1
+            alphas[node] = alpha
+            events = events[:kept] + [(alpha, remaining - 1, errors[node] - err)]
+            cost[node] = (base, leaves, events)
+        return alphas
+
+    def cost_complexity_path(self) -> Dict[str, np.ndarray]:
+        """Caminho de poda: alphas efetivos crescentes, erro total e número de folhas em cada um."""
+        alphas = self.cost_complexity_alphas()
+        # Um nó sai no menor alpha entre ele e seus ancestrais
+        parent = self.parents()
+        effective = alphas.copy()
+        for node in range(1, self.n_nodes):
+            effective[node] = min(effective[node], effective[parent[node]])
+        path = np.unique(np.concatenate(([0.0], effective[np.isfinite(effective)])))
+        total = max(int(self.value[0].sum()), 1)
+        errors = (self.value.sum(axis=1) - self.value.max(axis=1, initial=0)) / total
+        impurities, n_leaves = [], []
+        for alpha in path:
+            pruned_leaf = (effective <= alpha) & ((parent < 0) | (effective[np.maximum(parent, 0)] > alpha))
+            is_leaf = pruned_leaf | ((self.kind == NODE_LEAF) & (effective > alpha))
+            impurities.append(errors[is_leaf].sum())
+            n_leaves.append(int(is_leaf.sum()))
+        return {'ccp_alphas': path, 'impurities': np.asarray(impurities), 'n_leaves': np.asarray(n_leaves)}
+
+    def prune_cost_complexity(self, ccp_alpha: float) -> "CompactTree":
+        """Subárvore ótima para `ccp_alpha`, sem retreinar."""
+        return self.collapse(self.cost_complexity_alphas() <= ccp_alpha)
+
+    def prune_reduced_error(self, X_val: pd.DataFrame, y_val: pd.Series) -> "CompactTree":
+        """Poda por erro reduzido, de baixo para cima, com o conjunto de validação."""
+        k = len(self.classes)
+        labels = pd.Index(self.classes).get_indexer(y_val.to_numpy())
+        # Rótulos de validação desconhecidos ganham uma coluna extra (sempre erro)
+        labels = np.where(labels >= 0, labels, k)
+        terminal = self.route(X_val)
+        reached = (self.decision_path(terminal).T @ sparse.csr_matrix(
+            (np.ones(len(labels)), (np.arange(len(labels)), labels)), shape=(len(labels), k + 1))).toarray()
+        stopped = np.bincount(terminal * (k + 1) + labels, minlength=self.n_nodes * (k + 1)).reshape(self.n_nodes, k + 1)
+        as_leaf = reached.sum(axis=1) - reached[np.arange(self.n_nodes), self.leaf_class]
+        subtree_errors = as_leaf.astype(np.float64)
+        collapsed = np.zeros(self.n_nodes, dtype=bool)
+        for node in np.flatnonzero(self.kind != NODE_LEAF)[::-1]:
+            # Linhas que pararam no próprio nó (categoria não vista) usam o fallback dele
+            own = stopped[node].sum() - stopped[node, self.leaf_class[node]]
+            errors = own + sum(subtree_errors[child] for _, child in self.children_of(node))
+            if as_leaf[node] <= errors:
+                collapsed[node] = True
+            else:
+                subtree_errors[node] = errors
+        return self.collapse(collapsed)
+
+    def compile(self) -> "CompiledTree":
+        """Gera código Python (if/else aninhados) para inferência de uma linha por vez."""
+        return CompiledTree(self)
+
+    @classmethod
+    def concatenate(cls, trees: list) -> tuple["CompactTree", np.ndarray]:
+        """Junta árvores com os mesmos atributos, classes e vocabulários; retorna a árvore única e as raízes."""
+        first = trees[0]
+        for tree in trees[1:]:
+            if (tree.feature_names != first.feature_names or not np.array_equal(tree.classes, first.classes)
+                    or any(not pd.Index(a).equals(pd.Index(b)) for a, b in zip(tree.categories, first.categories))):
+                raise ValueError("As árvores precisam compartilhar atributos, classes e vocabulários.")
+        node_base = np.concatenate(([0], np.cumsum([t.n_nodes for t in trees])[:-1])).astype(np.int32)
+        table_base = np.concatenate(([0], np.cumsum([len(t.child_table) for t in trees])[:-1])).astype(np.int32)
+
+        def shifted(name: str, bases: np.ndarray) -> np.ndarray:
+            return np.concatenate([np.where(getattr(t, name) >= 0, getattr(t, name) + b, -1) for t, b in zip(trees, bases)]).astype(np.int32)
+        stacked = cls(
+            feature_names=first.feature_names, classes=first.classes, categories=first.categories,
+            kind=np.concatenate([t.kind for t in trees]), feature=np.concatenate([t.feature for t in trees]),
+            threshold=np.concatenate([t.threshold for t in trees]), left=shifted('left', node_base),
+            right=shifted('right', node_base), child_offset=shifted('child_offset', table_base),
+            child_table=np.concatenate([np.where(t.child_table >= 0, t.child_table + b, -1) for t, b in zip(trees, node_base)]).astype(np.int32),
+            leaf_class=np.concatenate([t.leaf_class for t in trees]), value=np.concatenate([t.value for t in trees]),
+            n_node_samples=np.concatenate([t.n_node_samples for t in trees]),
+        )
+        return stacked, node_base
+
+    def _node_value_dict(self, i: int) -> dict:
+        counts = self.value[i]
+        order = np.argsort(-counts, kind='stable')
+        return {self.classes[c]: int(counts[c]) for c in order if counts[c] > 0}
+
+    def children_of(self, i: int) -> list:
+        """Pares (aresta, filho) de um nó, na ordem original das arestas."""
+        if self.kind[i] == NODE_NUMERIC:
+            return [(edge, child) for edge, child in (('<=', self.left[i]), ('>', self.right[i])) if child >= 0]
+        if self.kind[i] == NODE_CATEGORICAL:
+            vocabulary = self.categories[self.feature[i]]
+            table = self.child_table[self.child_offset[i]:self.child_offset[i] + len(vocabulary)]
+            codes = np.flatnonzero(table >= 0)
+            codes = codes[np.argsort(table[codes], kind='stable')]
+            children = []
+            for child in np.unique(table[codes]):
+                group = codes[table[codes] == child]
+                edge = vocabulary[group[0]] if len(group) == 1 else tuple(vocabulary[group])
+                children.append((edge, int(child)))
+            return children
+        return []
+
+    def to_dict(self) -> dict:
+        """Reconstrói o formato de dicionários aninhados (usado por `_get_tree_graph`)."""
+        nodes = []
+        for i in range(self.n_nodes):
+            if self.kind[i] == NODE_LEAF:
+                nodes.append({'leaf_value': self.classes[self.leaf_class[i]], 'samples': int(self.n_node_samples[i]), 'value': self._node_value_dict(i)})
+            else:
+                threshold = self.threshold[i] if self.kind[i] == NODE_NUMERIC else 'Categórico'
+                nodes.append({
+                    'feature': self.feature_names[self.feature[i]], 'threshold': threshold,
+                    'samples': int(self.n_node_samples[i]), 'value': self._node_value_dict(i), 'children': {}
+                })
+        for i in np.flatnonzero(self.kind != NODE_LEAF):
+            for edge, child in self.children_of(i):
+                nodes[i]['children'][edge] = nodes[child]
+        return nodes[0]
+
+
+class CompiledTree:
+    """Árvore compilada em funções Python geradas, para inferência de baixa latência."""
+    MAX_NESTING = 32
+
+    def __init__(self, tree: CompactTree):
+        self.feature_names = list(tree.feature_names)
+        self._tree = tree
+        self._vocabularies = []
+        for vocab in tree.categories:
+            vocabulary = {v: code for code, v in enumerate(vocab.tolist())}
+            # Ausentes de qualquer tipo (e NaN, que não é igual a si mesmo) também têm a chave única
+            vocabulary.update({_category_key(v): code for code, v in enumerate(vocab.tolist()) if pd.api.types.is_scalar(v) and pd.isna(v)})
+            self._vocabularies.append(vocabulary)
+        namespace = {'_C': tuple(tree.classes.tolist()), '_N': tuple(self.feature_names), '_K': _category_key}
+        namespace.update({f'_V{j}': vocabulary for j, vocabulary in enumerate(self._vocabularies)})
+        self.source = self._generate('d') + self._generate('t')
+        exec(compile(self.source, '<compiled_tree>', 'exec'), namespace)
+        self._predict_dict, self._predict_tuple = namespace['predict_d'], namespace['predict_t']
+
+    def _accessor(self, mode: str, feature: int) -> str:
+        if mode == 't':
+            return f"x[{feature}]"
+        name = self.feature_names[feature]
+        return f"x[{name!r}]" if isinstance(name, (str, int)) else f"x[_N[{feature}]]"
+
+    @staticmethod
+    def _float_literal(value: float) -> str:
+        # repr(inf) e repr(nan) seriam nomes soltos no código gerado
+        return repr(value) if math.isfinite(value) else f"float({str(value)!r})"
+
+    @staticmethod
+    def _code_test(vocabulary: dict, edge: Any) -> str:
+        # Arestas agrupadas (tuplas de valores) viram um teste de pertinência
+        if isinstance(edge, tuple):
+            return f"c in {tuple(vocabulary[_category_key(value)] for value in edge)!r}"
+        return f"c == {vocabulary[_category_key(edge)]}"
+
+    def _generate(self, mode: str) -> str:
+        tree, functions = self._tree, []
+        pending = [0]
+        while pending:
+            root = pending.pop()
+            lines = [f"def {'predict' if root == 0 else f'_n{root}'}_{mode}(x):"]
+            stack = [(root, 1)]
+            while stack:
+                item, level = stack.pop()
+                pad = '    ' * level
+                if isinstance(item, str):
+                    lines.append(pad + item)
+                    continue
+                node = item
+                if tree.kind[node] == NODE_LEAF:
+                    lines.append(f"{pad}return _C[{tree.leaf_class[node]}]")
+                    continue
+                if level - 1 >= self.MAX_NESTING and node != root:
+                    pending.append(node)
+                    lines.append(f"{pad}return _n{node}_{mode}(x)")
+                    continue
+                access = self._accessor(mode, tree.feature[node])
+                fallback = f"return _C[{tree.leaf_class[node]}]"
+                if tree.kind[node] == NODE_NUMERIC:
+                    # 'else' cobre valores maiores e NaN, como em `CompactTree.route`
+                    branches = [(f"if {access} <= {self._float_literal(float(tree.threshold[node]))}:", tree.left[node]), ("else:", tree.right[node])]
+                else:
+                    lines.append(f"{pad}c = _V{tree.feature[node]}.get({access}, -1)")
+                    vocabulary = self._vocabularies[tree.feature[node]]
+                    if _MISSING_CATEGORY in vocabulary:
+                        # Só valores fora do vocabulário pagam a normalização dos ausentes
+                        lines.append(f"{pad}if c < 0: c = _V{tree.feature[node]}.get(_K({access}), -1)")
+                    branches = [(f"{'if' if k == 0 else 'elif'} {self._code_test(vocabulary, edge)}:", child)
+                                for k, (edge, child) in enumerate(tree.children_of(node))]
+                    branches.append(("else:", -1))
+                # Empilha em ordem inversa: cabeçalho do ramo seguido do corpo
+                for header, child in reversed(branches):
+                    stack.append((fallback, level + 1) if child < 0 else (int(child), level + 1))
+                    stack.append((header, level))
+            functions.append('\n'.join(lines))
+        return '\n\n'.join(functions) + '\n\n'
+
+    def __call__(self, x: Union[dict, tuple, list]) -> Any:
+        return self._predict_dict(x) if isinstance(x, dict) else self._predict_tuple(x)
+
+
+# =====================================================================
+# 6. API PRINCIPAL UNIFICADA
+# =====================================================================
+
+def _algorithm_from_name(algorithm: str) -> AlgorithmType:
+    alg_map = {
+        'id3': AlgorithmType.ID3,
+        'c4.5': AlgorithmType.C45,
+        'c45': AlgorithmType.C45,
+        'cart': AlgorithmType.CART
+    }
+    key = algorithm.strip().lower().replace(".", "")
+    if key in alg_map:
+        return alg_map[key]
+    if algorithm.strip().upper() == 'C4.5':
+        return AlgorithmType.C45
+    raise ValueError(f"Algoritmo '{algorithm}' não suportado. Use 'ID3', 'C4.5' ou 'CART'.")
+
+
 class OptimizedDecisionTree:
     """Classe unificada para treinar e usar árvores de decisão otimizadas."""
 
-    def __init__(self, algorithm: str = 'cart', max_depth: int = 10):
-        alg_map = {
-            'id3': AlgorithmType.ID3,
-            'c4.5': AlgorithmType.C45,
-            'c45': AlgorithmType.C45,
-            'cart': AlgorithmType.CART
-        }
-        key = algorithm.strip().lower().replace(".", "")
-        if key in alg_map:
-            self.algorithm_type = alg_map[key]
-        elif algorithm.strip().upper() == 'C4.5':
-            self.algorithm_type = AlgorithmType.C45
-        else:
-            raise ValueError(f"Algoritmo '{algorithm}' não suportado. Use 'ID3', 'C4.5' ou 'CART'.")
+    def __init__(self, algorithm: str = 'cart', max_depth: int = 10, presort: bool = False, splitter: str = 'exact', max_bins: int = 255,
+                 n_jobs: int = 1, parallel_backend: str = 'threads', growth: str = 'recursive',
+                 hoeffding_delta: float = 1e-7, grace_period: int = 200, tie_threshold: float = 0.05,
+                 min_samples_split: int = 2, min_impurity_decrease: float = 0.0, max_time: Optional[float] = None,
+                 max_nodes: Optional[int] = None, max_memory_bytes: Optional[int] = None,
+                 categorical_split: str = 'multiway', min_category_samples: int = 0, profile: bool = False,
+                 artifact_cache: Union[str, ArtifactCache, None] = None, memo_table: Optional[AdvancedMemoizationTable] = None):
+        self.algorithm_type = _algorithm_from_name(algorithm)
+        if splitter not in ('exact', 'hist'):
+            raise ValueError(f"Splitter '{splitter}' não suportado. Use 'exact' ou 'hist'.")
+        if growth not in ('recursive', 'levelwise', 'best_first'):
+            raise ValueError(f"Crescimento '{growth}' não suportado. Use 'recursive', 'levelwise' ou 'best_first'.")
+        self.budget = TrainingBudget(max_time, max_nodes, max_memory_bytes)
+        if self.budget != TrainingBudget() and (growth != 'best_first' or splitter != 'exact'):
+            raise ValueError("Orçamentos de tempo, nós ou memória exigem growth='best_first' e splitter='exact'.")
+        if categorical_split not in ('multiway', 'binary'):
+            raise ValueError(f"Divisão categórica '{categorical_split}' não suportada. Use 'multiway' ou 'binary'.")
+        if (categorical_split != 'multiway' or min_category_samples > 0) and splitter != 'exact':
+            raise ValueError("categorical_split='binary' e min_category_samples exigem splitter='exact'.")
+        if not 2 <= max_bins <= 65534:
+            raise ValueError("max_bins deve estar entre 2 e 65534.")
+        if n_jobs != 1 and (splitter != 'exact' or growth != 'recursive'):
+            raise ValueError("n_jobs != 1 exige splitter='exact' e growth='recursive'; os demais modos rodam em série.")
+        if not 0 < hoeffding_delta < 1:
+            raise ValueError("hoeffding_delta deve estar entre 0 e 1.")
         self.max_depth = max_depth
-        self.memo_table = AdvancedMemoizationTable()
-        self.tree_builder = OptimizedTreeBuilder(self.algorithm_type, self.memo_table)
-        self.tree = None
+        self.presort = presort
+        self.splitter = splitter
+        self.max_bins = max_bins
+        self.growth = growth
+        self.hoeffding_delta = hoeffding_delta
+        self.grace_period = grace_period
+        self.tie_threshold = tie_threshold
+        self.profile = profile
+        self.profiler_: Optional[TrainingProfiler] = None
+        # Artefatos de codificação em disco e tabela de memoização podem ser compartilhados entre modelos
+        self.artifact_cache = ArtifactCache(artifact_cache) if isinstance(artifact_cache, str) else artifact_cache
+        self.memo_table = memo_table if memo_table is not None else AdvancedMemoizationTable()
+        self.tree_builder = OptimizedTreeBuilder(self.algorithm_type, self.memo_table, n_jobs, parallel_backend)
+        self.tree_builder.min_samples_split = min_samples_split
+        self.tree_builder.min_impurity_decrease = min_impurity_decrease
+        self.tree_builder.categorical_split = categorical_split
+        self.tree_builder.min_category_samples = min_category_samples
+        self.fit_metrics_: Dict[str, Any] = {}
+        # Esquema dos atributos do treino ({nome: dtype}), conferido em cada predição
+        self.feature_names_in_: Optional[list] = None
+        self.feature_dtypes_: Dict[str, str] = {}
+        self._compact_tree: Optional[CompactTree] = None
+        self._compiled: Optional[CompiledTree] = None
+        self._incremental: Optional[HoeffdingTreeLearner] = None
+        self._incremental_dirty = False
+
+    @property
+    def compact_tree(self) -> Optional[CompactTree]:
+        """Árvore ajustada; no modo incremental é rematerializada só quando há lotes novos."""
+        if self._incremental_dirty:
+            learner = self._incremental
+            self._compact_tree = CompactTree.from_dict(learner.to_dict(), learner.feature_names)
+            self._incremental_dirty = False
+        return self._compact_tree
+
+    @compact_tree.setter
+    def compact_tree(self, compact_tree: Optional[CompactTree]):
+        # Atribuir uma árvore (fit, load) descarta o estado do treino incremental
+        self._compact_tree = compact_tree
+        self._incremental, self._incremental_dirty = None, False
+
+    def partial_fit(self, X: pd.DataFrame, y: pd.Series):
+        """Atualiza a árvore com um lote novo, no estilo Hoeffding (ver `HoeffdingTreeLearner`)."""
+        if self._incremental is None:
+            if self.tree_builder.groups_categories:
+                raise ValueError("partial_fit usa divisões categóricas com um filho por valor; mantenha categorical_split='multiway' e min_category_samples=0.")
+            if self.tree_builder.n_jobs > 1:
+                raise ValueError("partial_fit roda em série; use n_jobs=1.")
+            self.compact_tree = None
+            self._incremental = HoeffdingTreeLearner(self.tree_builder, self.max_depth, self.max_bins,
+                                                     self.hoeffding_delta, self.grace_period, self.tie_threshold)
+            self.feature_names_in_ = list(X.columns)
+            self.feature_dtypes_ = {f: str(X[f].dtype) for f in X.columns}
+        self._incremental.partial_fit(X[self.feature_names_in_], y)
+        self._incremental_dirty = True
+        return self
+
+    @property
+    def tree(self) -> Optional[dict]:
+        """Árvore no formato de dicionários aninhados, reconstruída a partir de `compact_tree`."""
+        return self.compact_tree.to_dict() if self.compact_tree is not None else None
+
+    @tree.setter
+    def tree(self, tree: Optional[dict]):
+        self.compact_tree = CompactTree.from_dict(tree) if tree is not None else None
 
     def fit(self, X: pd.DataFrame, y: pd.Series):
         """Treina o modelo de árvore de decisão."""
         print(f"🚀 INICIANDO TREINAMENTO ({self.algorithm_type.name})...")
         start_time = time.perf_counter()
-        self.tree = self.tree_builder.build_tree(X, y, list(X.columns), 0, self.max_depth)
+        if len(X) == 0:
+            raise ValueError("Não há amostras para treinar: X e y estão vazios.")
+        cache = self.artifact_cache
+        artifact_counts = (cache.hits, cache.misses) if cache is not None else None
+        data = EncodedDataset.from_frame(X, y, self.tree_builder.continuous_features(X, self.splitter), cache)
+        rows = np.arange(data.n_samples)
+        budget_report = {}
+        # O pico do tracemalloc é global ao processo: com nós em threads concorrentes, os bytes por fase se misturariam
+        concurrent = self.tree_builder.n_jobs > 1 and self.tree_builder.parallel_backend == 'threads'
+        self.profiler_ = TrainingProfiler(self.memo_table, track_memory=not concurrent) if self.profile else None
+        self.tree_builder.profiler = self.profiler_
+        if self.profiler_ is not None:
+            self.profiler_.start()
+        try:
+            if self.splitter == 'hist':
+                data.add_bins(self.max_bins)
+                tree = self.tree_builder.build_tree_hist(data, rows, list(X.columns), 0, self.max_depth)
+            else:
+                sorted_index = self.tree_builder.presort_features(data) if self.presort else None
+                if self.growth == 'levelwise':
+                    tree = self.tree_builder.build_tree_levelwise(data, rows, list(X.columns), self.max_depth, sorted_index)
+                elif self.growth == 'best_first':
+                    tree, budget_report = self.tree_builder.build_tree_best_first(data, rows, list(X.columns), self.max_depth, self.budget)
+                else:
+                    tree = self.tree_builder.build(data, rows, list(X.columns), self.max_depth, sorted_index)
+        finally:
+            self.tree_builder.profiler = None
+            if self.profiler_ is not None:
+                self.profiler_.stop()
+        if tree is None:
+            raise ValueError("O treino não produziu uma árvore: nenhuma amostra chegou à raiz.")
+        self.compact_tree = CompactTree.from_dict(tree, list(X.columns), data.classes, data.categories)
+        self.feature_names_in_ = list(X.columns)
+        self.feature_dtypes_ = {f: str(X[f].dtype) for f in X.columns}
         end_time = time.perf_counter()
+        self.fit_metrics_ = {'fit_time_s': end_time - start_time, 'n_nodes': self.compact_tree.n_nodes, **budget_report}
+        if cache is not None:
+            self.fit_metrics_.update(artifact_hits=cache.hits - artifact_counts[0], artifact_misses=cache.misses - artifact_counts[1])
         print(f"   ⚡ Treinamento concluído em {end_time - start_time:.3f}s")
-        metrics = self.memo_table.metrics
-        total_hits = sum(metrics['hits'].values())
-        total_misses = sum(metrics['misses'].values())
-        total_calls = total_hits + total_misses
-        hit_rate = total_hits / total_calls if total_calls > 0 else 0
-        print(f"   📈 Cache Hit Rate: {hit_rate:.1%}")
-        print(f"   💾 Cache Hits: {total_hits}, Misses: {total_misses}")
+        if cache is not None:
+            print(f"   🗄️ Artefatos em disco: {self.fit_metrics_['artifact_hits']} reaproveitados, {self.fit_metrics_['artifact_misses']} calculados")
+        if budget_report.get('budget_stop_reason'):
+            print(f"   ⏱️ Orçamento esgotado ({budget_report['budget_stop_reason']}): {budget_report['budget_nodes']} nós, "
+                  f"{budget_report['budget_frontier_left']} nós da fronteira viraram folhas")
+        if self.profiler_ is not None:
+            levels = self.profiler_.levels()
+            print(f"   🔬 Perfil: {sum(level['nodes'] for level in levels)} nós, "
+                  f"busca {sum(level['split_search_s'] for level in levels):.3f}s, "
+                  f"particionamento {sum(level['partition_s'] for level in levels):.3f}s")
+        stats = self.memo_table.stats()
+        print(f"   📈 Cache Hit Rate: {stats['cache_hit_rate']:.1%}")
+        print(f"   💾 Cache Hits: {stats['cache_hits']}, Misses: {stats['cache_misses']}, Evictions: {stats['cache_evictions']}")
+        print(f"   🧮 Cache: {stats['cache_resident_bytes'] / 1024:.1f} KiB residentes, {stats['cache_net_time_saved_s'] * 1e3:.2f} ms economizados")
         return self
 
-    def _predict_single(self, x: pd.Series, node: Union[str, dict]) -> str:
-        """Navega na árvore para prever um único exemplo."""
-        if not isinstance(node, dict) or 'leaf_value' in node:
-            return node['leaf_value'] if isinstance(node, dict) else node
-        
-        feature = node['feature']
-        threshold = node['threshold']
-        
-        if threshold != 'Categórico':
-            key = '<=' if x[feature] <= threshold else '>'
-            child_node = node['children'].get(key)
-        else:
-            value = x[feature]
-            child_node = node['children'].get(value)
+    def compile(self) -> CompiledTree:
+        """Versão compilada da árvore para uma linha por vez (dict ou tupla de valores)."""
+        if self.compact_tree is None:
+            raise RuntimeError("O modelo deve ser treinado com .fit() antes de compilar.")
+        if self._compiled is None or self._compiled._tree is not self.compact_tree:
+            self._compiled = self.compact_tree.compile()
+        return self._compiled
+
+    def fit_stream(self, chunks: Union[Callable[[], Iterator[Any]], list], target: str):
+        """Treina fora da memória a partir de blocos de dados que contêm a coluna `target`."""
+        # `chunks`: função que recomeça a leitura a cada chamada ou sequência reiterável.
+        if self.tree_builder.groups_categories:
+            raise ValueError("fit_stream usa divisões categóricas com um filho por valor; mantenha categorical_split='multiway' e min_category_samples=0.")
+        if self.tree_builder.n_jobs > 1:
+            raise ValueError("fit_stream roda em série; use n_jobs=1.")
+        if not callable(chunks):
+            if iter(chunks) is chunks:
+                raise ValueError("fit_stream precisa reler os blocos a cada nível: passe uma função que crie o iterador.")
+            blocks = chunks
+            chunks = lambda: iter(blocks)
+        print(f"🚀 INICIANDO TREINAMENTO EM FLUXO ({self.algorithm_type.name})...")
+        start_time = time.perf_counter()
+        feature_dtypes = {}
 
-        if child_node is None:
-            # Fallback: retorna a classe majoritária do nó atual se o caminho não for encontrado
-            return max(node['value'], key=node['value'].get)
+        def frames():
+            for chunk in chunks():
+                chunk = chunk if isinstance(chunk, pd.DataFrame) else chunk.to_pandas()
+                X = chunk.drop(columns=[target])
+                if not feature_dtypes:
+                    feature_dtypes.update({f: str(X[f].dtype) for f in X.columns})
+                yield X, chunk[target]
 
-        return self._predict_single(x, child_node)
+        schema = EncodedDataset.schema_from_chunks(frames(), self.max_bins)
+        if schema.n_classes == 0:
+            raise ValueError("Não há amostras para treinar: os blocos estão vazios.")
+        tree = self.tree_builder.build_tree_stream(schema, lambda: (schema.encode_chunk(X, y) for X, y in frames()), self.max_depth)
+        self.compact_tree = CompactTree.from_dict(tree, schema.feature_names, schema.classes, schema.categories)
+        self.feature_names_in_ = list(schema.feature_names)
+        self.feature_dtypes_ = feature_dtypes
+        print(f"   ⚡ Treinamento concluído em {time.perf_counter() - start_time:.3f}s")
+        return self
 
-    def predict(self, X: pd.DataFrame) -> list:
-        """Faz predições para um conjunto de dados X."""
-        if self.tree is None:
+    def save(self, path: str):
+        """Grava o modelo treinado no formato binário versionado (ver `CompactTree.save`)."""
+        self._check_fitted()
+        self.compact_tree.save(path, {
+            'algorithm': self.algorithm_type.value, 'max_depth': self.max_depth, 'presort': self.presort,
+            'splitter': self.splitter, 'max_bins': self.max_bins, 'growth': self.growth,
+            'feature_names': self.feature_names_in_, 'feature_dtypes': self.feature_dtypes_,
+        })
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, expected_features: Optional[Dict[str, Any]] = None) -> "OptimizedDecisionTree":
+        """Carrega um modelo gravado por `save`, mapeando os arrays de nós em memória."""
+        # `expected_features` ({nome: dtype}) divergente do treino gera ValueError.
+        compact_tree, meta = CompactTree.load(path, mmap)
+        if list(meta['feature_dtypes']) != meta['feature_names'] or compact_tree.feature_names != meta['feature_names']:
+            raise ValueError(f"Metadados de atributos inconsistentes em '{path}'.")
+        if expected_features is not None:
+            expected = {f: str(np.dtype(dtype)) if not isinstance(dtype, pd.api.extensions.ExtensionDtype) else str(dtype)
+                        for f, dtype in expected_features.items()}
+            if list(expected) != meta['feature_names']:
+                raise ValueError(f"Atributos {list(expected)} diferem dos usados no treino: {meta['feature_names']}.")
+            mismatched = {f: (expected[f], meta['feature_dtypes'][f]) for f in expected if expected[f] != meta['feature_dtypes'][f]}
+            if mismatched:
+                raise ValueError(f"Dtypes diferem dos usados no treino (atual, treino): {mismatched}.")
+        model = cls(algorithm=meta['algorithm'], max_depth=meta['max_depth'], presort=meta['presort'],
+                    splitter=meta['splitter'], max_bins=meta['max_bins'], growth=meta['growth'])
+        model.compact_tree = compact_tree
+        model.feature_names_in_ = meta['feature_names']
+        model.feature_dtypes_ = meta['feature_dtypes']
+        return model
+
+    def _with_tree(self, compact_tree: CompactTree) -> "OptimizedDecisionTree":
+        pruned = copy.copy(self)
+        pruned._compiled = None
+        pruned.compact_tree = compact_tree
+        return pruned
+
+    def cost_complexity_pruning_path(self) -> Dict[str, np.ndarray]:
+        """Alphas da poda de custo-complexidade (ver `CompactTree.cost_complexity_path`)."""
+        self._check_fitted()
+        return self.compact_tree.cost_complexity_path()
+
+    def prune(self, ccp_alpha: float) -> "OptimizedDecisionTree":
+        """Cópia do modelo com a árvore podada por custo-complexidade para `ccp_alpha`."""
+        self._check_fitted()
+        return self._with_tree(self.compact_tree.prune_cost_complexity(ccp_alpha))
+
+    def prune_reduced_error(self, X_val: pd.DataFrame, y_val: pd.Series) -> "OptimizedDecisionTree":
+        """Cópia do modelo com a árvore podada por erro reduzido em um conjunto de validação."""
+        self._check_fitted()
+        return self._with_tree(self.compact_tree.prune_reduced_error(X_val, y_val))
+
+    def get_performance_metrics(self) -> dict:
+        """Estatísticas do cache somadas às métricas do último treino (tempo, nós e orçamento)."""
+        return {**self.memo_table.stats(), **self.fit_metrics_}
+
+    def _check_fitted(self):
+        if self.compact_tree is None:
             raise RuntimeError("O modelo deve ser treinado com .fit() antes de prever.")
-        return [self._predict_single(row, self.tree) for _, row in X.iterrows()]
+
+    def _route(self, X: pd.DataFrame) -> np.ndarray:
+        """Roteia `X` após conferir seus atributos e dtypes com o esquema do treino (também gravado por `save`)."""
+        self._check_fitted()
+        missing = [f for f in self.feature_dtypes_ if f not in X.columns]
+        if missing:
+            raise ValueError(f"Atributos usados no treino ausentes em X: {missing}.")
+        mismatched = {f: (str(X[f].dtype), dtype) for f, dtype in self.feature_dtypes_.items() if str(X[f].dtype) != dtype}
+        if mismatched:
+            raise ValueError(f"Dtypes diferem dos usados no treino (atual, treino): {mismatched}.")
+        return self.compact_tree.route(X)
+
+    @property
+    def classes_(self) -> np.ndarray:
+        """Rótulos das classes, na ordem das colunas de `predict_proba`."""
+        self._check_fitted()
+        return self.compact_tree.classes
+
+    def predict(self, X: pd.DataFrame) -> list:
+        """Faz predições para um conjunto de dados X (todas as linhas roteadas em lote)."""
+        ct = self.compact_tree
+        return ct.classes[ct.leaf_class[self._route(X)]].tolist()
+
+    def apply(self, X: pd.DataFrame) -> np.ndarray:
+        """Índice do nó final de cada linha (folha, ou o nó interno do fallback de categoria não vista)."""
+        return self._route(X)
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """Probabilidades de classe (colunas em `classes_`) a partir da distribuição do nó final."""
+        return self.compact_tree.node_proba()[self._route(X)]
+
+    def decision_path(self, X: pd.DataFrame) -> "sparse.csr_matrix":
+        """Matriz esparsa (n_amostras x n_nós) com 1 nos nós visitados por cada linha."""
+        return self.compact_tree.decision_path(self._route(X))
 
     def _get_tree_graph(self, dot, node, class_names, parent_name=None, edge_label=""):
         """Função recursiva para construir o gráfico da árvore com Graphviz (versão melhorada)."""
@@ -315,4 +2595,442 @@ class OptimizedDecisionTree:
         if parent_name:
             dot.edge(parent_name, node_name, label=str(edge_label))
         for edge, child_node in node['children'].items():
-            self._get_tree_graph(dot, child_node, class_names, parent_name=node_name, edge_label=str(edge))
\ No newline at end of file
+            self._get_tree_graph(dot, child_node, class_names, parent_name=node_name, edge_label=str(edge))
+
+
+# =====================================================================
+# 7. ENSEMBLE: FLORESTA ALEATÓRIA
+# =====================================================================
+
+def _fit_forest_tree(builder: OptimizedTreeBuilder, data: EncodedDataset, seed: int, max_depth: int, max_features: Optional[int], bootstrap: bool) -> Optional[dict]:
+    """Uma árvore da floresta: amostra bootstrap (como índices) e atributos sorteados por nó."""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.integers(0, data.n_samples, data.n_samples)) if bootstrap else np.arange(data.n_samples)
+    builder.max_features, builder.rng = max_features, rng
+    try:
+        return builder.build(data, rows, data.feature_names, max_depth)
+    finally:
+        builder.max_features, builder.rng = None, None
+
+
+def _build_forest_trees_in_worker(spec: dict, algorithm_value: str, seeds: list, max_depth: int, max_features: Optional[int], bootstrap: bool) -> list:
+    """Ponto de entrada dos processos: constrói um lote de árvores sobre o dataset compartilhado."""
+    builder, data = _worker_builder(spec, algorithm_value)
+    return [_fit_forest_tree(builder, data, seed, max_depth, max_features, bootstrap) for seed in seeds]
+
+
+class OptimizedForest:
+    """Floresta aleatória sobre o OptimizedTreeBuilder, mantendo a semântica de ID3/C4.5/CART."""
+
+    def __init__(self, algorithm: str = 'cart', n_estimators: int = 100, max_depth: int = 10, max_features: Union[str, int, float, None] = 'sqrt',
+                 bootstrap: bool = True, n_jobs: int = 1, parallel_backend: str = 'processes', random_state: Optional[int] = None):
+        self.algorithm_type = _algorithm_from_name(algorithm)
+        if parallel_backend not in ('threads', 'processes'):
+            raise ValueError(f"Backend paralelo '{parallel_backend}' não suportado. Use 'threads' ou 'processes'.")
+        if n_estimators < 1:
+            raise ValueError("n_estimators deve ser ao menos 1.")
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.max_features = max_features
+        self.bootstrap = bootstrap
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+        self.parallel_backend = parallel_backend
+        self.random_state = random_state
+        self.memo_table = AdvancedMemoizationTable()
+        self.estimators_: list = []
+        self._stacked: Optional[CompactTree] = None
+
+    def _resolve_max_features(self, n_features: int) -> Optional[int]:
+        if self.max_features is None:
+            return None
+        if self.max_features == 'sqrt':
+            return max(1, int(math.sqrt(n_features)))
+        if self.max_features == 'log2':
+            return max(1, int(math.log2(n_features)))
+        if isinstance(self.max_features, float):
+            return max(1, int(self.max_features * n_features))
+        if isinstance(self.max_features, int):
+            return min(n_features, self.max_features)
+        raise ValueError(f"max_features '{self.max_features}' não suportado. Use 'sqrt', 'log2', int, float ou None.")
+
+    def fit(self, X: pd.DataFrame, y: pd.Series):
+        """Treina `n_estimators` árvores em amostras bootstrap."""
+        print(f"🌲 INICIANDO FLORESTA ({self.algorithm_type.name}, {self.n_estimators} árvores)...")
+        start_time = time.perf_counter()
+        builder = OptimizedTreeBuilder(self.algorithm_type, self.memo_table)
+        data = EncodedDataset.from_frame(X, y, builder.continuous_features(X))
+        max_features = self._resolve_max_features(len(data.feature_names))
+        seeds = np.random.default_rng(self.random_state).integers(0, 2**63 - 1, self.n_estimators).tolist()
+        batches = [list(batch) for batch in np.array_split(np.asarray(seeds, dtype=object), min(self.n_estimators, 4 * self.n_jobs))]
+        if self.n_jobs == 1:
+            trees = [_fit_forest_tree(builder, data, seed, self.max_depth, max_features, self.bootstrap) for seed in seeds]
+        elif self.parallel_backend == 'processes':
+            shared = SharedDatasetBuffers(data)
+            try:
+                with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                    futures = [executor.submit(_build_forest_trees_in_worker, shared.spec, self.algorithm_type.value, batch,
+                                               self.max_depth, max_features, self.bootstrap) for batch in batches]
+                    trees = [tree for future in futures for tree in future.result()]
+            finally:
+                shared.close()
+        else:
+            # Um construtor por tarefa (o sorteio de atributos é estado do construtor); o cache é compartilhado
+            def build_batch(batch: list) -> list:
+                batch_builder = OptimizedTreeBuilder(self.algorithm_type, self.memo_table)
+                return [_fit_forest_tree(batch_builder, data, seed, self.max_depth, max_features, self.bootstrap) for seed in batch]
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                trees = [tree for result in executor.map(build_batch, batches) for tree in result]
+        self.estimators_ = [CompactTree.from_dict(tree, data.feature_names, data.classes, data.categories) for tree in trees]
+        self._stacked, self._roots = CompactTree.concatenate(self.estimators_)
+        self._node_proba = self._stacked.node_proba()
+        self.feature_names_in_ = list(X.columns)
+        print(f"   ⚡ Floresta treinada em {time.perf_counter() - start_time:.3f}s ({self._stacked.n_nodes} nós)")
+        return self
+
+    @property
+    def classes_(self) -> np.ndarray:
+        if self._stacked is None:
+            raise RuntimeError("O modelo deve ser treinado com .fit() antes de prever.")
+        return self._stacked.classes
+
+    def predict_proba(self, X: pd.DataFrame, block_size: int = 1 << 22) -> np.ndarray:
+        """Média das distribuições das folhas de todas as árvores, em blocos de linhas."""
+        classes = self.classes_
+        proba = np.empty((len(X), len(classes)))
+        rows_per_block = max(1, block_size // len(self._roots))
+        for start in range(0, len(X), rows_per_block):
+            nodes = self._stacked.route(X.iloc[start:start + rows_per_block], self._roots)
+            proba[start:start + rows_per_block] = self._node_proba[nodes].mean(axis=0)
+        return proba
+
+    def predict(self, X: pd.DataFrame) -> list:
+        """Classe de maior probabilidade média entre as árvores."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)].tolist()
+
+
+
+# =====================================================================
+# 8. GRADIENT BOOSTING COM HISTOGRAMAS
+# =====================================================================
+
+class OptimizedGradientBoosting:
+    """Gradient boosting de árvores rasas no estilo CART sobre os bins do modo 'hist'."""
+
+    def __init__(self, n_estimators: int = 100, learning_rate: float = 0.1, max_depth: int = 3, max_bins: int = 255,
+                 reg_lambda: float = 1.0, min_child_weight: float = 1e-3, min_split_gain: float = 0.0):
+        if not 2 <= max_bins <= 65534:
+            raise ValueError("max_bins deve estar entre 2 e 65534.")
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.max_bins = max_bins
+        self.reg_lambda = reg_lambda
+        self.min_child_weight = min_child_weight
+        self.min_split_gain = min_split_gain
+        self.classes_: Optional[np.ndarray] = None
+
+    def _histogram(self, rows: np.ndarray, gradients: np.ndarray, hessians: np.ndarray) -> Dict[str, np.ndarray]:
+        """Tabela (valor x [gradiente, hessiana]) de cada atributo nas linhas do nó."""
+        weights = np.column_stack((gradients[rows], hessians[rows]))
+        return self._data.contingency_tables(rows, self.feature_names_in_, weights=weights)
+
+    def _best_split(self, hist: Dict[str, np.ndarray]) -> Optional[tuple[float, int, np.ndarray]]:
+        """Melhor (ganho, atributo, tabela código -> vai para a esquerda) do nó."""
+        lam = self.reg_lambda
+        g_total, h_total = hist[self.feature_names_in_[0]].sum(axis=0)
+        parent_score = g_total ** 2 / (h_total + lam)
+        best = None
+        for j, feature in enumerate(self.feature_names_in_):
+            g, h = hist[feature][:, 0], hist[feature][:, 1]
+            if feature in self._data.bin_edges:
+                order = np.arange(len(self._data.bin_edges[feature]) + 1)
+            else:
+                present = np.flatnonzero(h > 0)
+                order = present[np.argsort(g[present] / (h[present] + lam), kind='stable')]
+            gl, hl = np.cumsum(g[order])[:-1], np.cumsum(h[order])[:-1]
+            gr, hr = g_total - gl, h_total - hl
+            gains = 0.5 * (gl ** 2 / (hl + lam) + gr ** 2 / (hr + lam) - parent_score)
+            gains[(hl < self.min_child_weight) | (hr < self.min_child_weight)] = -np.inf
+            if gains.size == 0:
+                continue
+            cut = int(np.argmax(gains))
+            if best is None or gains[cut] > best[0]:
+                # Uma posição extra para categorias não vistas, que seguem para a direita
+                goes_left = np.zeros(len(g) + 1, dtype=bool)
+                goes_left[order[:cut + 1]] = True
+                best = (float(gains[cut]), j, goes_left)
+        if best is None or best[0] <= self.min_split_gain:
+            return None
+        return best
+
+    def _add_node(self, feature: int = -1, goes_left: Optional[np.ndarray] = None, value: float = 0.0) -> int:
+        node = len(self._node_feature)
+        self._node_feature.append(feature)
+        self._node_lookup.append(len(self._lookup))
+        if goes_left is not None:
+            self._lookup.extend(goes_left.tolist())
+        self._node_left.append(-1)
+        self._node_right.append(-1)
+        self._node_value.append(value)
+        return node
+
+    def _grow_tree(self, gradients: np.ndarray, hessians: np.ndarray, raw: np.ndarray) -> int:
+        """Cresce uma árvore em profundidade, atualizando `raw` nas linhas de cada folha."""
+        rows = np.arange(len(gradients))
+        root = self._add_node()
+        stack = [(root, rows, 0, self._histogram(rows, gradients, hessians))]
+        while stack:
+            node, rows, depth, hist = stack.pop()
+            split = self._best_split(hist) if depth < self.max_depth and rows.size > 1 else None
+            if split is None:
+                g_total = gradients[rows].sum()
+                h_total = hessians[rows].sum()
+                value = -self.learning_rate * g_total / (h_total + self.reg_lambda)
+                self._node_value[node] = value
+                raw[rows] += value
+                continue
+            _, feature, goes_left = split
+            self._node_feature[node] = feature
+            self._node_lookup[node] = len(self._lookup)
+            self._lookup.extend(goes_left.tolist())
+            mask = goes_left[self._data.codes(self.feature_names_in_[feature])[rows]]
+            children = (rows[mask], rows[~mask])
+            # Truque da subtração: histograma do filho menor é varrido, o do maior sai do pai
+            small = 0 if children[0].size <= children[1].size else 1
+            small_hist = self._histogram(children[small], gradients, hessians)
+            large_hist = {f: hist[f] - small_hist[f] for f in hist}
+            hists = (small_hist, large_hist) if small == 0 else (large_hist, small_hist)
+            left, right = self._add_node(), self._add_node()
+            self._node_left[node], self._node_right[node] = left, right
+            stack.append((right, children[1], depth + 1, hists[1]))
+            stack.append((left, children[0], depth + 1, hists[0]))
+        return root
+
+    def fit(self, X: pd.DataFrame, y: pd.Series):
+        """Treina `n_estimators` rodadas de boosting."""
+        print(f"🚀 INICIANDO GRADIENT BOOSTING ({self.n_estimators} rodadas)...")
+        start_time = time.perf_counter()
+        numeric_features = [f for f in X.columns if pd.api.types.is_numeric_dtype(X[f].dtype)]
+        data = EncodedDataset.from_frame(X, y, numeric_features).add_bins(self.max_bins)
+        self._data = data
+        self.feature_names_in_ = list(X.columns)
+        self._node_feature, self._node_lookup, self._node_left, self._node_right, self._node_value = [], [], [], [], []
+        self._lookup = []
+        self._roots, self._tree_class = [], []
+
+        self.classes_ = data.classes
+        n_outputs = 1 if len(self.classes_) == 2 else len(self.classes_)
+        onehot = np.eye(len(self.classes_))[data.y_codes]
+        target = onehot[:, 1:] if n_outputs == 1 else onehot
+        prior = np.clip(target.mean(axis=0), 1e-12, 1 - 1e-12)
+        self.init_score_ = np.log(prior / (1 - prior)) if n_outputs == 1 else np.log(prior)
+        raw = np.tile(self.init_score_, (data.n_samples, 1))
+        for _ in range(self.n_estimators):
+            proba = self._link(raw)
+            gradients, hessians = proba - target, np.maximum(proba * (1 - proba), 1e-16)
+            for k in range(n_outputs):
+                self._roots.append(self._grow_tree(gradients[:, k], hessians[:, k], raw[:, k]))
+                self._tree_class.append(k)
+        self._node_arrays = tuple(np.asarray(a) for a in (self._node_feature, self._node_lookup, self._node_left, self._node_right, self._node_value))
+        self._lookup_array = np.asarray(self._lookup, dtype=bool)
+        print(f"   ⚡ Boosting concluído em {time.perf_counter() - start_time:.3f}s ({len(self._node_feature)} nós)")
+        return self
+
+    @staticmethod
+    def _link(raw: np.ndarray) -> np.ndarray:
+        if raw.shape[1] == 1:
+            return 1.0 / (1.0 + np.exp(-raw))
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _encode(self, X: pd.DataFrame) -> np.ndarray:
+        """Códigos de `X` no esquema do treino; categorias não vistas vão para a posição extra."""
+        data = self._data
+        codes = np.empty((len(X), len(self.feature_names_in_)), dtype=np.intp)
+        for j, feature in enumerate(self.feature_names_in_):
+            if feature in data.bin_edges:
+                codes[:, j] = EncodedDataset._digitize(X[feature].to_numpy(dtype=np.float64, na_value=np.nan), data.bin_edges[feature])
+            else:
+                found = pd.Index(data.categories[feature]).get_indexer(X[feature].to_numpy(dtype=object))
+                codes[:, j] = np.where(found >= 0, found, len(data.categories[feature]))
+        return codes
+
+    def decision_function(self, X: pd.DataFrame, block_size: int = 1 << 22) -> np.ndarray:
+        """Escore bruto (log-odds ou logits), somando todas as árvores roteadas juntas."""
+        if self.classes_ is None:
+            raise RuntimeError("O modelo deve ser treinado com .fit() antes de prever.")
+        feature, lookup, left, right, value = self._node_arrays
+        roots, tree_class = np.asarray(self._roots), np.asarray(self._tree_class)
+        codes = self._encode(X)
+        raw = np.tile(self.init_score_, (len(X), 1))
+        rows_per_block = max(1, block_size // len(roots))
+        for start in range(0, len(X), rows_per_block):
+            block = codes[start:start + rows_per_block]
+            n = len(block)
+            node = np.repeat(roots, n)
+            row = np.tile(np.arange(n), len(roots))
+            active = np.flatnonzero(feature[node] >= 0)
+            while active.size:
+                at = node[active]
+                goes_left = self._lookup_array[lookup[at] + block[row[active], feature[at]]]
+                node[active] = np.where(goes_left, left[at], right[at])
+                active = active[feature[node[active]] >= 0]
+            contributions = value[node].reshape(len(roots), n)
+            for k in range(raw.shape[1]):
+                raw[start:start + n, k] += contributions[tree_class == k].sum(axis=0)
+        return raw
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        proba = self._link(self.decision_function(X))
+        return np.hstack((1 - proba, proba)) if proba.shape[1] == 1 else proba
+
+    def predict(self, X: pd.DataFrame) -> list:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)].tolist()
+
+
+# =====================================================================
+# 9. VALIDAÇÃO CRUZADA E BUSCA DE HIPERPARÂMETROS
+# =====================================================================
+
+# Parâmetros que só mudam o crescimento da árvore: todos os candidatos e folds usam a mesma codificação
+SEARCH_PARAMS = ('max_depth', 'min_samples_split', 'min_impurity_decrease', 'categorical_split', 'min_category_samples')
+
+
+def stratified_folds(y_codes: np.ndarray, n_splits: int = 5, random_state: Optional[int] = 0) -> list:
+    """(linhas de treino, linhas de teste) de cada fold, com a proporção das classes preservada."""
+    n = len(y_codes)
+    if not 2 <= n_splits <= n:
+        raise ValueError(f"cv deve estar entre 2 e o número de amostras ({n}).")
+    shuffled = np.random.default_rng(random_state).permutation(n)
+    by_class = shuffled[np.argsort(y_codes[shuffled], kind='stable')]
+    fold_of = np.empty(n, dtype=np.intp)
+    fold_of[by_class] = np.arange(n) % n_splits
+    return [(np.flatnonzero(fold_of != k), np.flatnonzero(fold_of == k)) for k in range(n_splits)]
+
+
+def _fit_and_score(builder: OptimizedTreeBuilder, data: EncodedDataset, settings: dict, max_depth: int,
+                   train_rows: np.ndarray, test_rows: np.ndarray) -> tuple[float, float]:
+    """Treina um candidato nas linhas de treino e devolve (acurácia nas de teste, tempo de treino)."""
+    builder.__dict__.update(settings)
+    start = time.perf_counter()
+    # `build` particiona as linhas no lugar e as mesmas linhas servem a vários candidatos
+    tree = builder.build(data, train_rows.copy(), data.feature_names, max_depth)
+    fit_time = time.perf_counter() - start
+    compact = CompactTree.from_dict(tree, data.feature_names, data.classes, data.categories)
+    predicted = compact.leaf_class[compact.route_encoded(data, test_rows)]
+    return float(np.mean(predicted == data.y_codes[test_rows])), fit_time
+
+
+def _score_candidates_in_worker(spec: dict, algorithm_value: str, tasks: list) -> list:
+    """Ponto de entrada dos processos: treina e avalia um lote de pares (candidato, fold) no dataset compartilhado."""
+    builder, data = _worker_builder(spec, algorithm_value)
+    return [_fit_and_score(builder, data, *task) for task in tasks]
+
+
+@contextmanager
+def _candidate_scorer(algorithm_type: AlgorithmType, data: EncodedDataset, n_jobs: int) -> Iterator[Callable[[list], list]]:
+    """Função que avalia uma lista de tarefas (configurações, profundidade, treino, teste), em ordem."""
+    if n_jobs == 1:
+        builder = OptimizedTreeBuilder(algorithm_type, AdvancedMemoizationTable())
+        yield lambda tasks: [_fit_and_score(builder, data, *task) for task in tasks]
+        return
+    shared = SharedDatasetBuffers(data)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            def score(tasks: list) -> list:
+                bounds = np.linspace(0, len(tasks), min(len(tasks), 4 * n_jobs) + 1).astype(int)
+                futures = [executor.submit(_score_candidates_in_worker, shared.spec, algorithm_type.value, tasks[lo:hi])
+                           for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+                return [result for future in futures for result in future.result()]
+            yield score
+    finally:
+        shared.close()
+
+
+def _expand_grid(param_grid: Union[dict, list]) -> list:
+    """Candidatos de uma grade ({parâmetro: valores}) ou de uma lista de grades, na ordem de declaração."""
+    candidates = []
+    for grid in ([param_grid] if isinstance(param_grid, dict) else param_grid):
+        unknown = set(grid) - set(SEARCH_PARAMS)
+        if unknown:
+            raise ValueError(f"Parâmetros {sorted(unknown)} não suportados na busca. Use {', '.join(SEARCH_PARAMS)}.")
+        names = list(grid)
+        candidates.extend(dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names)))
+    if not candidates:
+        raise ValueError("A grade de parâmetros não tem candidatos.")
+    return candidates
+
+
+def grid_search(algorithm: str, X: pd.DataFrame, y: pd.Series, param_grid: Union[dict, list], cv: int = 5, n_jobs: int = 1,
+                halving: bool = True, factor: int = 3, min_resources: Optional[int] = None, random_state: Optional[int] = 0,
+                artifact_cache: Union[str, ArtifactCache, None] = None, **params) -> Dict[str, Any]:
+    """Busca em grade com validação cruzada estratificada e, opcionalmente, halving sucessivo."""
+    if factor < 2:
+        raise ValueError("factor deve ser ao menos 2.")
+    algorithm_type = _algorithm_from_name(algorithm)
+    candidates = _expand_grid(param_grid)
+    fixed = _expand_grid({name: [value] for name, value in params.items()})[0]
+    # O construtor do modelo valida cada combinação; só as configurações de divisão seguem para as tarefas
+    models = [OptimizedDecisionTree(algorithm, **{**fixed, **candidate}) for candidate in candidates]
+    settings = [model.tree_builder.split_settings() for model in models]
+    depths = [model.max_depth for model in models]
+
+    print(f"🔎 INICIANDO BUSCA ({algorithm_type.name}, {len(candidates)} candidatos x {cv} folds)...")
+    start_time = time.perf_counter()
+    builder = OptimizedTreeBuilder(algorithm_type, AdvancedMemoizationTable())
+    cache = ArtifactCache(artifact_cache) if isinstance(artifact_cache, str) else artifact_cache
+    data = EncodedDataset.from_frame(X, y, builder.continuous_features(X), cache)
+    folds = stratified_folds(data.y_codes, cv, random_state)
+    # Subamostras aninhadas: cada rodada estende as linhas de treino da anterior
+    rng = np.random.default_rng(random_state)
+    shuffled = [rng.permutation(train) for train, _ in folds]
+    full = min(len(train) for train, _ in folds)
+    min_resources = min_resources if min_resources is not None else 2 * cv * data.n_classes
+    # Uma rodada a mais enquanto houver candidatos para descartar e linhas para a primeira rodada
+    n_rounds = 1
+    while halving and factor ** n_rounds <= len(candidates) and full // factor ** n_rounds >= min_resources:
+        n_rounds += 1
+
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    survivors, records = list(range(len(candidates))), []
+    with _candidate_scorer(algorithm_type, data, min(n_jobs, len(candidates) * cv)) as score:
+        for round_index in range(n_rounds):
+            last = round_index == n_rounds - 1
+            n_resources = full // factor ** (n_rounds - 1 - round_index)
+            print(f"   Rodada {round_index + 1}/{n_rounds}: {len(survivors)} candidatos com ~{n_resources} linhas de treino por fold")
+            tasks = [(settings[c], depths[c], folds[k][0] if last else np.sort(shuffled[k][:n_resources]), folds[k][1])
+                     for k in range(cv) for c in survivors]
+            results = np.asarray(score(tasks)).reshape(cv, len(survivors), 2)
+            scores, fit_times = results[..., 0], results[..., 1]
+            for i, c in enumerate(survivors):
+                records.append({
+                    'round': round_index, 'n_resources': n_resources, 'candidate': c,
+                    **{f'param_{name}': value for name, value in candidates[c].items()}, 'params': candidates[c],
+                    'mean_score': float(scores[:, i].mean()), 'std_score': float(scores[:, i].std()),
+                    'fold_scores': scores[:, i].tolist(), 'fold_fit_times_s': fit_times[:, i].tolist(),
+                })
+            means = scores.mean(axis=0)
+            if not last:
+                keep = np.sort(np.argsort(-means, kind='stable')[:math.ceil(len(survivors) / factor)])
+                survivors = [survivors[i] for i in keep]
+    best = int(np.argmax(means))
+    best_params = {**fixed, **candidates[survivors[best]]}
+    elapsed = time.perf_counter() - start_time
+    print(f"   ⚡ Busca concluída em {elapsed:.3f}s: melhor {best_params} (acurácia {means[best]:.4f})")
+    return {
+        'best_params': best_params, 'best_score': float(means[best]),
+        'best_std': float(scores[:, best].std()), 'best_fold_scores': scores[:, best].tolist(),
+        'best_fold_fit_times_s': fit_times[:, best].tolist(), 'cv_results': pd.DataFrame(records),
+        'n_rounds': n_rounds, 'n_fits': sum(len(r['fold_scores']) for r in records), 'search_time_s': elapsed,
+    }
+
+
+def cross_validate(algorithm: str, X: pd.DataFrame, y: pd.Series, cv: int = 5, n_jobs: int = 1, random_state: Optional[int] = 0,
+                   artifact_cache: Union[str, ArtifactCache, None] = None, **params) -> Dict[str, Any]:
+    """Validação cruzada estratificada (acurácia e tempo de treino por fold) de uma configuração."""
+    search = grid_search(algorithm, X, y, {}, cv=cv, n_jobs=n_jobs, halving=False, random_state=random_state,
+                         artifact_cache=artifact_cache, **params)
+    return {
+        'test_score': np.asarray(search['best_fold_scores']), 'fit_time_s': np.asarray(search['best_fold_fit_times_s']),
+        'mean_score': search['best_score'], 'std_score': search['best_std'],
+    }
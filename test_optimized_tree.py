@@ -0,0 +1,330 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import optimized_tree as ot
+from class_c45 import C45DecisionTree
+from class_cart import CARTDecisionTree
+from class_id3 import ID3DecisionTree
+
+ALGORITHMS = ['id3', 'c45', 'cart']
+MAX_DEPTH = 6
+
+
+@pytest.fixture(scope='module')
+def heart():
+    dados = pd.read_csv('heart.csv')
+    return dados.drop(columns='target'), dados['target']
+
+
+@pytest.fixture(scope='module')
+def exact(heart):
+    """Árvore de referência (splitter='exact', crescimento recursivo) de cada algoritmo."""
+    X, y = heart
+    return {alg: ot.OptimizedDecisionTree(alg, max_depth=MAX_DEPTH).fit(X, y) for alg in ALGORITHMS}
+
+
+def fit(heart, algorithm, **params):
+    X, y = heart
+    return ot.OptimizedDecisionTree(algorithm, max_depth=MAX_DEPTH, **params).fit(X, y)
+
+
+# --- Modos que devem reproduzir exatamente a árvore do builder exato ---
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+@pytest.mark.parametrize('params', [
+    pytest.param({'presort': True}, id='presort'),
+    pytest.param({'n_jobs': 2, 'parallel_backend': 'threads'}, id='threads'),
+    pytest.param({'n_jobs': 2, 'parallel_backend': 'processes'}, id='processes'),
+    pytest.param({'growth': 'levelwise'}, id='levelwise'),
+    pytest.param({'growth': 'best_first'}, id='best_first'),
+])
+def test_mode_matches_exact(heart, exact, algorithm, params):
+    model = fit(heart, algorithm, **params)
+    assert repr(model.tree) == repr(exact[algorithm].tree)
+
+
+@pytest.mark.parametrize('params', [{}, {'splitter': 'hist'}, {'growth': 'levelwise'}, {'presort': True}])
+def test_fit_rejects_empty_data(heart, params):
+    X, y = heart
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree('cart', **params).fit(X.iloc[:0], y.iloc[:0])
+
+
+def test_fit_stream_rejects_empty_chunks(heart):
+    X, y = heart
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree('cart').fit_stream([X.iloc[:0].assign(target=y.iloc[:0])], 'target')
+
+
+@pytest.mark.parametrize('params', [{'splitter': 'hist'}, {'growth': 'levelwise'}, {'growth': 'best_first'}])
+def test_serial_modes_reject_n_jobs(params):
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree('cart', n_jobs=2, **params)
+
+
+def test_streaming_rejects_n_jobs(heart):
+    X, y = heart
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree('cart', n_jobs=2).partial_fit(X, y)
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree('cart', n_jobs=2).fit_stream([X.assign(target=y)], 'target')
+
+
+@pytest.mark.parametrize('n_jobs, tracked', [(1, True), (2, False)])
+def test_profiler_memory_only_without_threads(heart, n_jobs, tracked):
+    # O pico do tracemalloc é global: com threads, os bytes por nó não são medidos
+    profiler = fit(heart, 'cart', n_jobs=n_jobs, profile=True).profiler_
+    assert profiler.track_memory is tracked
+    assert (sum(record['bytes_allocated'] for record in profiler.nodes) > 0) is tracked
+
+
+@pytest.mark.parametrize('algorithm', ['c45', 'cart'])
+def test_hist_matches_exact_structure(heart, exact, algorithm):
+    # Só os limiares diferem: pontos médios globais no 'hist', locais ao nó no 'exact'
+    X, _ = heart
+    hist, reference = fit(heart, algorithm, splitter='hist').compact_tree, exact[algorithm].compact_tree
+    for name in ('kind', 'feature', 'value', 'n_node_samples', 'leaf_class'):
+        np.testing.assert_array_equal(getattr(hist, name), getattr(reference, name))
+    np.testing.assert_array_equal(hist.route(X), reference.route(X))
+
+
+@pytest.mark.parametrize('n_children', [2, ot.PARTITION_MASK_MAX_CHILDREN + 12, 200])
+def test_partition_rows_matches_stable_sort(n_children):
+    rng = np.random.default_rng(0)
+    rows = rng.permutation(2 * ot.PARTITION_BLOCK_ROWS + 5_000).astype(np.intp)
+    child_ids = rng.integers(-1, n_children, len(rows)).astype(np.intp)
+    expected = rows[np.argsort(child_ids, kind='stable')]
+    builder = ot.OptimizedTreeBuilder(ot.AlgorithmType.CART, ot.AdvancedMemoizationTable())
+    children = builder._partition_rows(rows, child_ids, n_children)
+    np.testing.assert_array_equal(rows, expected)
+    for child, child_rows in enumerate(children):
+        np.testing.assert_array_equal(child_rows, expected[np.sort(child_ids) == child])
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_fit_stream_matches_hist(heart, algorithm):
+    X, y = heart
+    dados = X.assign(target=y)
+    chunks = [dados.iloc[i:i + 100] for i in range(0, len(dados), 100)]
+    stream = ot.OptimizedDecisionTree(algorithm, max_depth=MAX_DEPTH).fit_stream(chunks, 'target')
+    assert repr(stream.tree) == repr(fit(heart, algorithm, splitter='hist').tree)
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_artifact_cache_matches_exact(heart, exact, algorithm, tmp_path):
+    for _ in range(2):  # a segunda execução lê os artefatos do disco
+        model = fit(heart, algorithm, artifact_cache=str(tmp_path))
+        assert repr(model.tree) == repr(exact[algorithm].tree)
+
+
+# --- Inferência: compilação, persistência e caminhos de decisão ---
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_compile_matches_predict(heart, exact, algorithm):
+    X, _ = heart
+    model = exact[algorithm]
+    compiled = model.compile()
+    expected = model.predict(X)
+    assert [compiled(row) for row in X.to_dict('records')] == expected
+    assert [compiled(row) for row in X.itertuples(index=False)] == expected
+
+
+def test_compile_non_finite_thresholds():
+    for threshold, expected in [(float('inf'), 'a'), (float('-inf'), 'b'), (float('nan'), 'b')]:
+        tree = {'feature': 'x', 'threshold': threshold, 'samples': 2, 'value': {'a': 1, 'b': 1}, 'children': {
+            '<=': {'leaf_value': 'a', 'samples': 1, 'value': {'a': 1}},
+            '>': {'leaf_value': 'b', 'samples': 1, 'value': {'b': 1}},
+        }}
+        compiled = ot.CompactTree.from_dict(tree, ['x'], np.array(['a', 'b'])).compile()
+        assert compiled({'x': 1.0}) == expected
+        assert compiled((1.0,)) == expected
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_decision_path_matches_route(heart, exact, algorithm):
+    X, _ = heart
+    tree = exact[algorithm].compact_tree
+    nodes = tree.route(X)
+    path = tree.decision_path(nodes).toarray().astype(bool)
+    parent = tree.parents()
+    for row, node in enumerate(nodes):
+        expected = set()
+        while node >= 0:
+            expected.add(node)
+            node = parent[node]
+        assert set(np.flatnonzero(path[row])) == expected
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_save_load_roundtrip(heart, exact, algorithm, tmp_path):
+    X, _ = heart
+    path = str(tmp_path / 'modelo.bin')
+    exact[algorithm].save(path)
+    loaded = ot.OptimizedDecisionTree.load(path, expected_features=X.dtypes.to_dict())
+    assert loaded.predict(X) == exact[algorithm].predict(X)
+    with pytest.raises(ValueError):
+        ot.OptimizedDecisionTree.load(path, expected_features=X.iloc[:, 1:].dtypes.to_dict())
+    # Sem `expected_features`, o esquema gravado no arquivo é conferido na predição
+    loaded = ot.OptimizedDecisionTree.load(path)
+    with pytest.raises(ValueError):
+        loaded.predict(X.drop(columns=X.columns[0]))
+    with pytest.raises(ValueError):
+        loaded.predict_proba(X.astype({X.columns[0]: str}))
+
+
+# --- Poda ---
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_cost_complexity_pruning(heart, exact, algorithm):
+    X, y = heart
+    model = exact[algorithm]
+    # alpha = 0 só remove subárvores sem ganho: o erro de treino não muda
+    erro = lambda m: np.sum(np.asarray(m.predict(X)) != y.to_numpy())
+    pruned = model.prune(0.0)
+    assert erro(pruned) == erro(model) and pruned.compact_tree.n_nodes <= model.compact_tree.n_nodes
+    path = model.cost_complexity_pruning_path()
+    assert np.all(np.diff(path['ccp_alphas']) > 0)
+    assert np.all(np.diff(path['impurities']) >= -1e-12)
+    assert np.all(np.diff(path['n_leaves']) <= 0) and path['n_leaves'][-1] == 1
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_reduced_error_pruning(heart, algorithm):
+    X, y = heart
+    treino, validacao = np.arange(len(X)) % 3 != 0, np.arange(len(X)) % 3 == 0
+    model = ot.OptimizedDecisionTree(algorithm, max_depth=MAX_DEPTH).fit(X[treino], y[treino])
+    pruned = model.prune_reduced_error(X[validacao], y[validacao])
+    erro = lambda m: np.mean(np.asarray(m.predict(X[validacao])) != y[validacao].to_numpy())
+    assert pruned.compact_tree.n_nodes <= model.compact_tree.n_nodes
+    assert erro(pruned) <= erro(model)
+
+
+# --- Ensembles e busca ---
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_single_tree_forest_matches_exact(heart, exact, algorithm):
+    X, y = heart
+    forest = ot.OptimizedForest(algorithm, n_estimators=1, max_depth=MAX_DEPTH, max_features=None, bootstrap=False).fit(X, y)
+    assert forest.predict(X) == exact[algorithm].predict(X)
+
+
+def _nan_branch_data(values, n=4_000):
+    # `z` decide primeiro; dentro de cada ramo, as linhas com `x` ausente formam uma folha pura
+    rng = np.random.default_rng(0)
+    x, z = rng.choice(np.array(values, dtype=object), n), rng.choice(['a', 'b'], n)
+    missing = pd.isna(x)
+    y = np.where(missing, np.where(z == 'a', 'na', 'nb'), np.where(z == 'a', 'p', 'q'))
+    X = pd.DataFrame({'x': x, 'z': z})
+    return X.astype({'x': float}) if all(isinstance(v, float) for v in values) else X, pd.Series(y), missing
+
+
+# ID3 trata o numérico como categórico; 'None' num atributo texto é categórico para todos
+NAN_CASES = [('id3', [1.0, 2.0, np.nan]), ('id3', ['u', 'v', None]), ('c45', ['u', 'v', None]), ('cart', ['u', 'v', None])]
+
+
+@pytest.mark.parametrize('algorithm, values', NAN_CASES)
+def test_missing_category_routes_to_its_child(algorithm, values):
+    X, y, missing = _nan_branch_data(values)
+    model = ot.OptimizedDecisionTree(algorithm, max_depth=3).fit(X, y)
+    assert pd.isna(model.compact_tree.categories[0]).sum() == 1
+    assert model.predict(X[missing]) == y[missing].tolist()
+
+
+@pytest.mark.parametrize('algorithm, values', NAN_CASES)
+def test_compile_routes_missing_values(algorithm, values):
+    X, y, missing = _nan_branch_data(values)
+    compiled = ot.OptimizedDecisionTree(algorithm, max_depth=3).fit(X, y).compile()
+    expected = y[missing].tolist()
+    assert [compiled(row) for row in X[missing].to_dict('records')] == expected
+    row = X[missing].iloc[0].to_dict()
+    for marker in (None, float('nan'), np.nan):
+        assert compiled({**row, 'x': marker}) == expected[0]
+
+
+@pytest.mark.parametrize('algorithm, values', NAN_CASES)
+def test_forest_with_missing_values(algorithm, values):
+    X, y, missing = _nan_branch_data(values)
+    forest = ot.OptimizedForest(algorithm, n_estimators=5, max_depth=4, random_state=0).fit(X, y)
+    assert forest.predict(X[missing]) == y[missing].tolist()
+
+
+def test_gradient_boosting(heart):
+    X, y = heart
+    model = ot.OptimizedGradientBoosting(n_estimators=30, max_depth=3).fit(X, y)
+    proba = model.predict_proba(X)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert np.mean(np.asarray(model.predict(X)) == y.to_numpy()) > 0.85
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_cross_validate_matches_manual_folds(heart, algorithm):
+    X, y = heart
+    folds = ot.stratified_folds(pd.factorize(y, sort=True)[0], 5, 0)
+    manual = []
+    for treino, teste in folds:
+        model = ot.OptimizedDecisionTree(algorithm, max_depth=4).fit(X.iloc[treino], y.iloc[treino])
+        manual.append(np.mean(np.asarray(model.predict(X.iloc[teste])) == y.iloc[teste].to_numpy()))
+    serial = ot.cross_validate(algorithm, X, y, cv=5, max_depth=4)
+    np.testing.assert_allclose(serial['test_score'], manual)
+    np.testing.assert_allclose(ot.cross_validate(algorithm, X, y, cv=5, n_jobs=2, max_depth=4)['test_score'], manual)
+
+
+def test_grid_search_serial_matches_parallel(heart):
+    X, y = heart
+    grid = {'max_depth': [2, 4, 6], 'min_samples_split': [2, 20]}
+    serial = ot.grid_search('cart', X, y, grid, cv=3)
+    parallel = ot.grid_search('cart', X, y, grid, cv=3, n_jobs=2)
+    assert serial['best_params'] == parallel['best_params']
+    assert serial['best_score'] == parallel['best_score']
+    completo = ot.grid_search('cart', X, y, grid, cv=3, halving=False)
+    assert completo['best_score'] == completo['cv_results']['mean_score'].max()
+    with pytest.raises(ValueError):
+        ot.grid_search('cart', X, y, {'splitter': ['hist']})
+
+
+# --- Treino incremental ---
+
+
+def _drift_batch(rng, n, depois_do_drift):
+    X = pd.DataFrame({f: rng.choice([f'{f.lower()}0', f'{f.lower()}1'], n) for f in 'ABC'})
+    positivo = (X['A'] == 'a1') | (depois_do_drift & (X['B'] == 'b1'))
+    return X, pd.Series(np.where(positivo, 'pos', 'neg'))
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_partial_fit_with_drift(algorithm):
+    rng = np.random.default_rng(0)
+    model = ot.OptimizedDecisionTree(algorithm, grace_period=200)
+    for lote in range(30):
+        model.partial_fit(*_drift_batch(rng, 500, lote >= 10))
+    learner = model._incremental
+    # Estatísticas de divisão de cada folha batem com suas tabelas e só existem em folhas
+    for leaf, counts in learner.leaf_counts.items():
+        for table in learner.leaf_tables[leaf].values():
+            assert table.sum() == counts.sum()
+    assert not set(learner.leaf_counts) & set(learner.split_counts)
+
+    def walk(node):
+        if 'children' in node:
+            assert node['samples'] >= sum(child['samples'] for child in node['children'].values())
+            for child in node['children'].values():
+                walk(child)
+    walk(model.tree)
+    X, y = _drift_batch(rng, 2000, True)
+    assert np.mean(np.asarray(model.predict(X)) == y.to_numpy()) == 1.0
+
+
+# --- Adaptadores ---
+
+
+@pytest.mark.parametrize('adapter', [ID3DecisionTree, C45DecisionTree, CARTDecisionTree])
+def test_adapter_forwards_budget(heart, adapter):
+    X, y = heart
+    model = adapter(max_depth=MAX_DEPTH, growth='best_first', max_nodes=5, min_samples_split=20).fit(X, y)
+    metrics = model.get_performance_metrics()
+    assert metrics['budget_stop_reason'] == 'nodes' and metrics['budget_nodes'] <= 5
+    assert model.model.tree_builder.min_samples_split == 20